@@ -0,0 +1,182 @@
+from typing import Dict, Optional, Union
+import asyncio
+import multiprocessing
+import os
+import time
+
+# Per-process analyzer, created once by each worker
+_worker_analyzer = None
+
+
+def _init_worker():
+    global _worker_analyzer
+    from ai.emotion_recognition import EmotionRecognition
+    _worker_analyzer = EmotionRecognition(cache_size=0, media_cache_backend="none")
+
+
+def _run_analysis(kind: str, path: Union[str, bytes]) -> Dict:
+    analyzer = _worker_analyzer
+    if analyzer is None:
+        from ai.emotion_recognition import EmotionRecognition
+        analyzer = EmotionRecognition(cache_size=0, media_cache_backend="none")
+    if kind == "audio":
+        return analyzer.analyze_audio(path)
+    if kind == "video":
+        return analyzer.analyze_video(path)
+    raise ValueError(f"Unknown analysis kind: {kind}")
+
+
+class AnalysisQueueFull(Exception):
+    pass
+
+
+class AnalysisTimeout(Exception):
+    pass
+
+
+class _Generation:
+    """One multiprocessing.Pool and the jobs still waiting on it."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.outstanding = 0
+        self.retired = False
+
+
+class AnalysisPool:
+    """Process-pool tier for CPU-heavy audio and video analysis.
+
+    Jobs are submitted from the event loop and awaited without blocking it.
+    At most `max_workers + max_queue` jobs are accepted at once; beyond that
+    `run` raises AnalysisQueueFull. A job slower than `timeout` seconds
+    raises AnalysisTimeout and, since a stuck worker cannot be interrupted,
+    the pool is replaced: new jobs go to fresh workers while the old pool
+    finishes its other jobs and is then terminated. Workers are also
+    recycled after `max_tasks_per_worker` jobs to cap memory growth.
+
+    With `max_workers` of 0 (or before `start`) jobs run on the default
+    thread executor instead, which still keeps the event loop free.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 timeout: Optional[float] = None, max_tasks_per_worker: Optional[int] = None):
+        if max_workers is None:
+            max_workers = int(os.getenv("ANALYSIS_WORKERS", str(min(os.cpu_count() or 1, 4))))
+        if max_queue is None:
+            max_queue = int(os.getenv("ANALYSIS_QUEUE_SIZE", "16"))
+        if timeout is None:
+            timeout = float(os.getenv("ANALYSIS_TIMEOUT", "60"))
+        if max_tasks_per_worker is None:
+            max_tasks_per_worker = int(os.getenv("ANALYSIS_MAX_TASKS_PER_WORKER", "50"))
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout or None
+        self.max_tasks_per_worker = max_tasks_per_worker or None
+        # Spawned workers do not inherit the server's event loop, threads or sockets
+        self._context = multiprocessing.get_context("spawn")
+        self._current: Optional[_Generation] = None
+        self._retired = []
+        self._in_flight = 0
+        self.metrics = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0,
+                        "rejected": 0, "recycled_pools": 0, "busy_seconds": 0.0}
+
+    def start(self):
+        if self._current is None and self.max_workers > 0:
+            self._current = self._new_generation()
+            print(f"Analysis pool started with {self.max_workers} workers")
+
+    def shutdown(self):
+        for generation in self._retired:
+            generation.pool.terminate()
+        self._retired.clear()
+        if self._current is not None:
+            self._current.pool.terminate()
+            self._current = None
+
+    def _new_generation(self) -> _Generation:
+        return _Generation(self._context.Pool(
+            processes=self.max_workers,
+            initializer=_init_worker,
+            maxtasksperchild=self.max_tasks_per_worker
+        ))
+
+    def _retire(self, generation: _Generation):
+        """Route new jobs to a fresh pool; the old one is terminated once drained."""
+        if generation is self._current:
+            generation.retired = True
+            self._retired.append(generation)
+            self._current = self._new_generation()
+            self.metrics["recycled_pools"] += 1
+            print("Analysis job timed out, recycling worker pool")
+
+    async def run(self, kind: str, path: Union[str, bytes], timeout: Optional[float] = None) -> Dict:
+        """Run analyze_audio ("audio") or analyze_video ("video") off the event loop.
+
+        `path` may also be the file's bytes, which are sent to the worker as is.
+        """
+        capacity = max(self.max_workers, 1) + self.max_queue
+        if self._in_flight >= capacity:
+            self.metrics["rejected"] += 1
+            raise AnalysisQueueFull(f"Analysis queue is full ({capacity} jobs)")
+
+        loop = asyncio.get_running_loop()
+        timeout = timeout if timeout is not None else self.timeout
+        generation = self._current
+        self._in_flight += 1
+        self.metrics["submitted"] += 1
+        started = time.perf_counter()
+        try:
+            if generation is None:
+                future = loop.run_in_executor(None, _run_analysis, kind, path)
+            else:
+                future = loop.create_future()
+
+                def resolve(setter, value):
+                    if not future.done():
+                        setter(value)
+
+                generation.outstanding += 1
+                generation.pool.apply_async(
+                    _run_analysis, (kind, path),
+                    callback=lambda result: loop.call_soon_threadsafe(resolve, future.set_result, result),
+                    error_callback=lambda error: loop.call_soon_threadsafe(resolve, future.set_exception, error)
+                )
+
+            try:
+                result = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self.metrics["timeouts"] += 1
+                if generation is not None:
+                    self._retire(generation)
+                raise AnalysisTimeout(f"{kind} analysis took longer than {timeout}s")
+            except Exception:
+                self.metrics["failed"] += 1
+                raise
+
+            self.metrics["completed"] += 1
+            return result
+        finally:
+            self._in_flight -= 1
+            self.metrics["busy_seconds"] += time.perf_counter() - started
+            if generation is not None:
+                generation.outstanding -= 1
+                if generation.retired and generation.outstanding == 0 and generation in self._retired:
+                    # terminate() joins the pool's threads, so keep it off the loop
+                    self._retired.remove(generation)
+                    loop.run_in_executor(None, generation.pool.terminate)
+
+    def stats(self) -> Dict:
+        workers = max(self.max_workers, 1)
+        busy = min(self._in_flight, workers)
+        return {
+            "mode": "process" if self._current is not None else "thread",
+            "workers": self.max_workers,
+            "queue_capacity": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": self._in_flight - busy,
+            "utilization": busy / workers,
+            "timeout": self.timeout,
+            "max_tasks_per_worker": self.max_tasks_per_worker,
+            **self.metrics
+        }
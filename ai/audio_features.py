@@ -0,0 +1,237 @@
+from typing import Dict, Optional
+
+# Imported lazily from analyze_audio, so text-only paths never load librosa
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+from scipy import fft, signal
+
+# Analysis frame geometry at the reference rate used by analyze_audio
+TARGET_SR = 22050
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+PITCH_FMIN = float(librosa.note_to_hz('C2'))
+PITCH_FMAX = float(librosa.note_to_hz('C7'))
+
+# Fast tier: pitch is estimated at telephone rate, enough for the coarse labels
+FAST_SR = 8000
+FAST_VOICING_THRESHOLD = 0.3
+
+
+class AudioFeatureAccumulator:
+    """Running sums of the pitch, energy, brightness and noisiness features.
+
+    Samples at any rate are resampled on the fly to the 22.05 kHz reference
+    with a stateful soxr stream (the HQ filter librosa.load uses), so the
+    features match a whole-file librosa.load(sr=22050) analysis while only
+    about one block of `block_frames` frames is held in memory. Frames are
+    centred like librosa's defaults: half a frame of zeros is added before
+    the first sample and, by finish(), after the last.
+    """
+
+    def __init__(self, sr: int, block_frames: int = 256):
+        self.sr = sr
+        self.frame_length = FRAME_LENGTH
+        self.hop_length = HOP_LENGTH
+        block_frames = max(block_frames, 1)
+        self._block_length = FRAME_LENGTH + HOP_LENGTH * (block_frames - 1)
+        self._block_advance = HOP_LENGTH * block_frames
+        self.samples = 0
+        self._f0_sum = 0.0
+        self._f0_count = 0
+        self._rms_sum = 0.0
+        self._centroid_sum = 0.0
+        self._zcr_sum = 0.0
+        self._frames = 0
+        self._start_segment()
+
+    def _start_segment(self):
+        self._resampler = None
+        if self.sr != TARGET_SR:
+            self._resampler = soxr.ResampleStream(self.sr, TARGET_SR, 1, dtype="float32", quality="HQ")
+        self._pending = np.zeros(FRAME_LENGTH // 2, dtype=np.float32)
+        self._segment_samples = 0
+
+    def add_samples(self, y: np.ndarray):
+        """Fold mono samples at the native rate in; complete blocks are analysed right away."""
+        y = np.asarray(y, dtype=np.float32)
+        self.samples += len(y)
+        self._segment_samples += len(y)
+        if self._resampler is not None:
+            y = self._resampler.resample_chunk(y)
+        self._pending = np.concatenate([self._pending, y])
+        while len(self._pending) >= self._block_length:
+            self._analyze_block(self._pending[:self._block_length])
+            self._pending = self._pending[self._block_advance:]
+
+    def finish(self):
+        """Analyse the buffered tail of the recording; later samples start a new segment."""
+        if self._segment_samples:
+            tail = [self._pending]
+            if self._resampler is not None:
+                tail.append(self._resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+            tail.append(np.zeros(FRAME_LENGTH // 2, dtype=np.float32))
+            pending = np.concatenate(tail)
+            if len(pending) >= FRAME_LENGTH:
+                self._analyze_block(pending)
+        self._start_segment()
+
+    def _analyze_block(self, y: np.ndarray):
+        # `y` is at TARGET_SR and already padded, so frames are taken as they lie
+        framing = {"frame_length": FRAME_LENGTH, "hop_length": HOP_LENGTH, "center": False}
+        f0 = librosa.yin(y, fmin=PITCH_FMIN, fmax=PITCH_FMAX, sr=TARGET_SR, **framing)
+        rms = librosa.feature.rms(y=y, **framing)
+        centroid = librosa.feature.spectral_centroid(
+            y=y, sr=TARGET_SR, n_fft=FRAME_LENGTH, hop_length=HOP_LENGTH, center=False)
+        zcr = librosa.feature.zero_crossing_rate(y, **framing)
+        self.add_frames(f0, rms, centroid, zcr)
+
+    def add_frames(self, f0: np.ndarray, rms: np.ndarray, centroid: np.ndarray, zcr: np.ndarray):
+        """Fold per-frame feature values in; f0 of 0 marks an unvoiced frame."""
+        voiced = f0[f0 > 0]
+        self._f0_sum += float(voiced.sum())
+        self._f0_count += voiced.size
+        self._rms_sum += float(rms.sum())
+        self._centroid_sum += float(centroid.sum())
+        self._zcr_sum += float(zcr.sum())
+        self._frames += rms.shape[-1]
+
+    @property
+    def frames(self) -> int:
+        return self._frames
+
+    def summary(self) -> Dict:
+        frames = self._frames or 1
+        return {
+            "pitch_mean": self._f0_sum / self._f0_count if self._f0_count else 0.0,
+            "energy_mean": self._rms_sum / frames,
+            "centroid_mean": self._centroid_sum / frames,
+            "zcr_mean": self._zcr_sum / frames,
+            "duration": self.samples / self.sr if self.sr else 0.0
+        }
+
+
+def extract_audio_features(audio_path: str, max_duration: Optional[float] = 30.0,
+                           block_frames: int = 256) -> Dict:
+    """Summarise a recording block by block with constant memory.
+
+    Formats soundfile can stream (WAV, FLAC, OGG, ...) are read in native
+    rate blocks and resampled as they go; anything else falls back to a
+    single librosa.load capped at `max_duration`. `audio_path` may also be
+    a binary file object, e.g. an upload held in memory.
+    """
+    duration = max_duration or None
+    try:
+        sound_file = sf.SoundFile(audio_path)
+    except Exception:
+        # Not streamable by soundfile (e.g. m4a); decode once within the cap
+        y, sr = librosa.load(audio_path, sr=TARGET_SR, duration=duration or 30.0)
+        accumulator = AudioFeatureAccumulator(sr, block_frames)
+        accumulator.add_samples(y)
+        accumulator.finish()
+        return accumulator.summary()
+
+    with sound_file:
+        accumulator = AudioFeatureAccumulator(sound_file.samplerate, block_frames)
+        frames = int(duration * sound_file.samplerate) if duration else -1
+        # About one analysis block of native-rate samples per read
+        blocksize = max(int(HOP_LENGTH * block_frames * sound_file.samplerate / TARGET_SR), 1)
+        for block in sound_file.blocks(blocksize=blocksize, frames=frames, dtype="float32", always_2d=True):
+            accumulator.add_samples(block.mean(axis=1))
+        accumulator.finish()
+    return accumulator.summary()
+
+
+def _frame(y: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """Strided (n_frames, frame_length) view of `y`; no copy."""
+    if len(y) < frame_length:
+        y = np.pad(y, (0, frame_length - len(y)))
+    return np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length]
+
+
+def _autocorrelation_pitch(y: np.ndarray, sr: int) -> np.ndarray:
+    """Per-frame f0 from the strongest autocorrelation peak; 0 when unvoiced.
+
+    All frames are handled at once with batched single-precision FFTs.
+    Frames whose normalised peak is below FAST_VOICING_THRESHOLD count as
+    unvoiced.
+    """
+    n = max(int(round(FRAME_LENGTH * sr / TARGET_SR)), 2)
+    frames = _frame(y, n, n // 2)
+    n_fft = 1 << (2 * n - 1).bit_length()
+
+    # Autocorrelation by Wiener-Khinchin, zero-padded to avoid wrap-around
+    spectrum = fft.rfft(frames, n=n_fft, axis=1)
+    autocorr = fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, axis=1)[:, :n]
+    energy = autocorr[:, 0]
+    min_lag = max(int(sr / PITCH_FMAX), 1)
+    max_lag = min(int(sr / PITCH_FMIN), n - 2)
+    lags = autocorr[:, min_lag:max_lag + 1].copy()
+    # Ignore the zero-lag lobe: search only past each frame's first negative value
+    below_zero = lags < 0
+    first_negative = np.where(below_zero.any(axis=1), below_zero.argmax(axis=1), lags.shape[1])
+    lags[np.arange(lags.shape[1]) < first_negative[:, None]] = -np.inf
+    best = lags.argmax(axis=1)
+    rows = np.arange(len(lags))
+    peak = lags[rows, best]
+    voiced = np.isfinite(peak) & (energy > 1e-8) & (peak > FAST_VOICING_THRESHOLD * np.maximum(energy, 1e-8))
+
+    # Parabolic interpolation around the peak for sub-sample lag accuracy
+    lag = best + min_lag
+    left = autocorr[rows, lag - 1]
+    centre = autocorr[rows, lag]
+    right = autocorr[rows, lag + 1]
+    denominator = left - 2 * centre + right
+    offset = np.divide(0.5 * (left - right), denominator, out=np.zeros_like(denominator),
+                       where=np.abs(denominator) > 1e-12)
+    f0 = sr / (lag + np.clip(offset, -0.5, 0.5))
+    return np.where(voiced, f0, 0.0)
+
+
+def estimate_features_fast(y: np.ndarray, sr: int) -> Dict:
+    """Vectorized approximation of the accurate-tier features.
+
+    Energy, brightness and noisiness are computed like the accurate tier:
+    on the signal band-limited to the 22.05 kHz reference, in centred
+    FRAME_LENGTH/HOP_LENGTH frames, so they agree with it up to rounding.
+    Pitch, the expensive part, is estimated by autocorrelation on a copy
+    resampled to FAST_SR instead of running YIN at full rate.
+    """
+    accumulator = AudioFeatureAccumulator(sr)
+    accumulator.samples = len(y)
+    y = y.astype(np.float32, copy=False)
+    if sr != TARGET_SR:
+        y = soxr.resample(y, sr, TARGET_SR, quality="HQ")
+    padding = FRAME_LENGTH // 2
+    frames = _frame(np.pad(y, padding), FRAME_LENGTH, HOP_LENGTH)
+
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    # Edge padding for the crossing count, as librosa's zero_crossing_rate does
+    signs = np.signbit(_frame(np.pad(y, padding, mode="edge"), FRAME_LENGTH, HOP_LENGTH))
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / FRAME_LENGTH
+
+    window = signal.get_window("hann", FRAME_LENGTH).astype(np.float32)
+    magnitude = np.abs(fft.rfft(frames * window, axis=1))
+    total = magnitude.sum(axis=1)
+    centroid = np.divide(magnitude @ fft.rfftfreq(FRAME_LENGTH, d=1.0 / TARGET_SR).astype(np.float32), total,
+                         out=np.zeros_like(total), where=total > 0)
+
+    y = soxr.resample(y, TARGET_SR, FAST_SR, quality="LQ")
+    accumulator.add_frames(_autocorrelation_pitch(y, FAST_SR), rms, centroid, zcr)
+    return accumulator.summary()
+
+
+def extract_audio_features_fast(audio_path: str, max_duration: Optional[float] = 30.0) -> Dict:
+    """Fast-tier summary of a recording; see estimate_features_fast."""
+    try:
+        sound_file = sf.SoundFile(audio_path)
+    except Exception:
+        # Not readable by soundfile (e.g. m4a); decode once within the cap
+        y, sr = librosa.load(audio_path, sr=TARGET_SR, duration=max_duration or 30.0)
+        return estimate_features_fast(y, sr)
+
+    with sound_file:
+        frames = int(max_duration * sound_file.samplerate) if max_duration else -1
+        y = sound_file.read(frames=frames, dtype="float32", always_2d=True).mean(axis=1)
+        return estimate_features_fast(y, sound_file.samplerate)
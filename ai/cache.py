@@ -0,0 +1,226 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class TTLCache:
+    """Thread-safe in-process cache with LRU eviction and optional TTL.
+
+    Entries past `ttl` seconds are treated as misses and dropped on access;
+    once `max_size` entries are stored the least recently used one is
+    evicted. Hit/miss/eviction counters are exposed through `stats()`.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Any, value: Any):
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Any):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class DiskCache:
+    """SQLite-backed cache with the TTLCache interface that survives restarts.
+
+    Values must be JSON-serializable. TTL is measured in wall-clock time so
+    it stays meaningful across restarts; eviction drops the least recently
+    used rows once `max_size` rows or `max_bytes` of stored JSON is exceeded.
+    """
+
+    def __init__(self, path: str, max_size: int = 1024, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+
+            value, stored_at = row
+            now = time.time()
+            with self._conn:
+                if self.ttl is not None and now - stored_at > self.ttl:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self.expirations += 1
+                    self.misses += 1
+                    return default
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+
+            self.hits += 1
+            return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            now = time.time()
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now))
+                overflow = len(self) - self.max_size
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM entries WHERE key IN "
+                        "(SELECT key FROM entries ORDER BY accessed_at LIMIT ?)", (overflow,))
+                    self.evictions += overflow
+                if self.max_bytes:
+                    self._evict_bytes()
+
+    def _evict_bytes(self):
+        overflow = self._size_bytes() - self.max_bytes
+        if overflow <= 0:
+            return
+        evicted = []
+        rows = self._conn.execute(
+            "SELECT key, LENGTH(value) FROM entries ORDER BY accessed_at").fetchall()
+        for key, size in rows[:-1]:
+            # Always keep the newest row, even if it alone is over budget
+            if overflow <= 0:
+                break
+            evicted.append((key,))
+            overflow -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def _size_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM entries").fetchone()[0]
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "bytes": self._size_bytes(),
+            "max_bytes": self.max_bytes,
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+def build_cache(backend: str, max_size: int, ttl: Optional[float] = None,
+                path: Optional[str] = None, max_bytes: Optional[int] = None) -> Optional[Union[TTLCache, DiskCache]]:
+    """Create a cache for the configured backend ("memory", "disk" or "none").
+
+    `max_bytes` only applies to the disk backend.
+    """
+    backend = backend.lower()
+    if backend == "none" or max_size <= 0:
+        return None
+    if backend == "disk":
+        if not path:
+            raise ValueError("Disk cache backend requires a path")
+        return DiskCache(path, max_size=max_size, ttl=ttl, max_bytes=max_bytes)
+    if backend == "memory":
+        return TTLCache(max_size=max_size, ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -1,39 +1,101 @@
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
+from ai.cache import DiskCache, build_cache
+from ai.keyword_matcher import KeywordMatcher, PhraseMatcher, default_matcher
+from ai.llm_backend import CircuitBreaker, LLMBackend, create_backend
+from ai.prompt_builder import PromptBuilder
+from ai.summarizer import ConversationSummarizer
 
 load_dotenv()
 
+GEMINI_SYSTEM_PROMPT = """You are Aura, an empathetic AI mental health companion for youth. You provide supportive, understanding responses while being mindful of mental health best practices.
+
+Key guidelines:
+- Be empathetic and non-judgmental
+- Encourage professional help when needed
+- Focus on active listening and validation
+- Provide practical coping strategies
+- Recognize crisis signs and direct to appropriate resources
+- Maintain appropriate boundaries as an AI companion
+
+Current user emotion analysis: {emotion_label} (confidence: {emotion_confidence})
+
+{conversation_context}
+
+Respond to the user's message in a supportive, contextual way that considers their conversation history and current emotional state."""
+
 class Chatbot:
-    def __init__(self):
-        # Try to initialize Gemini
-        self.gemini_available = False
-        self.gemini_model = None
-        try:
-            import google.generativeai as genai
-            api_key = os.getenv("GEMINI_API_KEY")
-            if api_key:
-                genai.configure(api_key=api_key)
-                self.gemini_model = genai.GenerativeModel('gemini-2.0-flash')
-                self.gemini_available = True
-                print("Gemini AI integration enabled")
-            else:
-                print("Gemini API key not found, using fallback responses")
-        except ImportError:
-            print("Google Generative AI not available, using fallback responses")
-        except Exception as e:
-            print(
-                f"Gemini initialization failed: {e}, using fallback responses")
+    def __init__(self, matcher: Optional[KeywordMatcher] = None, llm_backend: Optional[LLMBackend] = None):
+        # Pluggable LLM backend: Gemini by default, "fake" for tests and
+        # load runs, or none for fallback responses only (LLM_BACKEND)
+        self.llm_backend = llm_backend if llm_backend is not None else create_backend()
+        self.gemini_available = self.llm_backend is not None
+
+        # Gemini calls run on a dedicated bounded executor so they never
+        # block the event loop; each call has a deadline after which the
+        # keyword fallback answers instead
+        self.llm_max_in_flight = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "8"))
+        self.llm_timeout = float(os.getenv("GEMINI_TIMEOUT", "10"))
+        self._llm_executor = ThreadPoolExecutor(
+            max_workers=self.llm_max_in_flight, thread_name_prefix="gemini")
+        self._llm_slots = asyncio.Semaphore(self.llm_max_in_flight)
+        self.llm_metrics = {"calls": 0, "in_flight": 0, "timeouts": 0, "errors": 0, "coalesced": 0,
+                            "short_circuited": 0, "hedged": 0}
+        self._llm_inflight = {}  # prompt key -> future shared by identical concurrent calls
+
+        # Stop calling the provider after repeated errors or slow calls
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            slow_call_threshold=float(os.getenv("LLM_BREAKER_SLOW_CALL", "0")) or None,
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30"))
+        )
+
+        # Hedged mode: the canned answer wins once this latency budget is
+        # spent, while the LLM call finishes in the background
+        self.llm_hedge_budget = float(os.getenv("LLM_HEDGE_BUDGET", "0")) or None
+        self._background_tasks = set()
+
+        # Response cache in front of Gemini: in-process by default, or a
+        # SQLite file that survives restarts (queried off the event loop).
+        # Keys are the rendered prompt ("prompt") or its normalized parts
+        # ("normalized").
+        self.llm_cache_key = os.getenv("LLM_CACHE_KEY", "prompt")
+        self.response_cache = build_cache(
+            os.getenv("LLM_CACHE_BACKEND", "memory"),
+            max_size=int(os.getenv("LLM_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "3600")) or None,
+            path=os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite3")
+        )
 
         # Conversation storage for digital twin
         self.conversation_history = {}  # user_id -> list of conversation turns
-        self.crisis_keywords = {
-            'suicide': ['suicide', 'kill myself', 'end it all', 'not worth living', 'better off dead'],
-            'self_harm': ['cut myself', 'hurt myself', 'self harm', 'self-harm', 'burn myself'],
-            'emergency': ['emergency', 'crisis', 'help me now', 'i can\'t take it', 'breaking point'],
-            'hopeless': ['no hope', 'hopeless', 'nothing matters', 'give up', 'end everything'],
-            'panic': ['panic attack', 'can\'t breathe', 'heart racing', 'freaking out', 'losing control']
-        }
+        
+        # Pre-rendered prompt template plus per-user context buffers
+        self.prompt_builder = PromptBuilder(
+            GEMINI_SYSTEM_PROMPT,
+            max_turns=int(os.getenv("PROMPT_MAX_TURNS", "5")),
+            context_budget=int(os.getenv("PROMPT_CONTEXT_BUDGET", "2000")),
+            max_message_chars=int(os.getenv("PROMPT_MAX_MESSAGE_CHARS", "1000"))
+        )
+        
+        # Turns dropped from the prompt window are folded into a running
+        # summary in the background
+        self.summarizer = ConversationSummarizer(
+            self.prompt_builder,
+            backend=self.llm_backend,
+            circuit_breaker=self.circuit_breaker,
+            batch_turns=int(os.getenv("SUMMARY_BATCH_TURNS", "5")),
+            max_chars=int(os.getenv("SUMMARY_MAX_CHARS", "600")),
+            timeout=self.llm_timeout
+        )
+        # Shared lexicon automaton (also used by EmotionRecognition)
+        self.matcher = matcher if matcher is not None else default_matcher
+        self.crisis_keywords = self.matcher.crisis_keywords
         
         # Crisis response templates
         self.crisis_responses = {
@@ -80,17 +142,164 @@ class Chatbot:
             "Staying connected with supportive people is important for well-being.",
             "Professional help is always available through therapists and counselors."
         ]
+        
+        # Emotion shortcuts answered before the LLM, in priority order
+        self.emotion_shortcuts = [
+            ('sad', ['sad', 'down', 'depressed'], "I can sense you're feeling down. Would you like to talk about what's bothering you?"),
+            ('anxious', ['anxious', 'anxiety', 'worried'], "I hear that you're feeling anxious. Let's try some calming techniques together."),
+            ('angry', ['angry', 'frustrated', 'upset'], "I hear frustration in your words. Can you tell me what's upsetting you?"),
+            ('happy', ['happy', 'good', 'great'], "I can hear the positivity! That's wonderful. What's making you feel good?")
+        ]
+        
+        # Enhanced keyword matching with more flexible patterns
+        self.keyword_responses = {
+            'hello': self.responses['hello'],
+            'hi': self.responses['hello'],
+            'hey': self.responses['hello'],
+            'stressed': self.responses['stressed'],
+            'stress': self.responses['stressed'],
+            'tensed': self.responses['stressed'],
+            'tense': self.responses['stressed'],
+            'anxious': self.responses['anxious'],
+            'anxiety': self.responses['anxious'],
+            'worried': self.responses['anxious'],
+            'sad': self.responses['sad'],
+            'down': self.responses['sad'],
+            'depressed': self.responses['sad'],
+            'angry': self.responses['angry'],
+            'mad': self.responses['angry'],
+            'upset': self.responses['angry'],
+            'frustrated': self.responses['angry'],
+            'lonely': self.responses['lonely'],
+            'alone': self.responses['lonely'],
+            'tired': self.responses['tired'],
+            'exhausted': self.responses['tired'],
+            'sleep': "Getting enough sleep is crucial for mental health. How has your sleep been lately?",
+            'exercise': "Regular physical activity can help improve your mood. Have you been able to exercise?",
+            'breathe': "Try this breathing exercise: inhale for 4 counts, hold for 4, exhale for 4. Would you like me to guide you through it?",
+            'help': self.responses['help'],
+            'okay': "I understand. Sometimes it's hard to find the right words. I'm here whenever you're ready to talk.",
+            'fine': "If you say you're fine, I'll believe you, but I'm here if you want to talk about anything.",
+            'good': "That's good to hear! What made today good for you?",
+            'bad': "I'm sorry to hear that. Would you like to talk about what's making things difficult?",
+            'terrible': "That sounds really tough. I'm here to listen if you want to share.",
+            'awful': "I'm sorry you're going through this. Your feelings are valid, and I'm here to support you.",
+            'scared': "Feeling scared can be really overwhelming. What's frightening you right now?",
+            'afraid': "It's okay to feel afraid sometimes. Can you tell me more about what's scaring you?",
+            'overwhelmed': "Feeling overwhelmed is completely understandable. Let's break this down together.",
+            'confused': "Confusion can be really unsettling. What feels unclear to you right now?",
+            'lost': "Feeling lost is a common experience. I'm here to help you find your way.",
+            'hopeless': "Even when things feel hopeless, there are always options and people who care. You're not alone.",
+            'worthless': "You are absolutely not worthless. Your life has value, and there are people who care about you.",
+            'useless': "That's not true at all. Everyone has worth and purpose. Let's talk about your strengths.",
+            'hate': "Hate is a strong emotion. Can you tell me what's making you feel this way?",
+            'hate myself': "I'm really concerned when I hear someone say they hate themselves. You deserve kindness and compassion.",
+            'suicidal': "I'm really concerned about what you're saying. Your safety is the most important thing right now. Please reach out to emergency services immediately: National Suicide Prevention Lifeline: 988 (24/7)",
+        }
+        
+        # Keyword hints drawn from the knowledge base
+        self.knowledge_keywords = {
+            'sleep': "Getting enough sleep is crucial for mental health.",
+            'exercise': "Regular physical activity can help improve your mood.",
+            'breathe': "Try this breathing exercise: inhale for 4, hold for 4, exhale for 4.",
+            'help': "Remember, it's okay to ask for help when you need it.",
+            'stress': "When stressed, try to break down tasks into smaller steps.",
+            'anxiety': "For anxiety, grounding techniques like naming 5 things you can see can help.",
+            'sad': "It's normal to feel sad sometimes. Talking about it can help.",
+            'happy': "That's wonderful! What makes you feel happy?",
+            'friend': "Having supportive friends is so important for mental health."
+        }
+        
+        self.feeling_words = ['feel', 'feeling', 'felt', 'feels']
+        
+        self._build_routing_table()
     
     def _detect_crisis(self, message: str) -> Optional[str]:
         """Detect crisis keywords in the message."""
-        message_lower = message.lower()
+        return self.matcher.scan(message)["crisis_type"]
+    
+    def _crisis_type_for(self, message: str, emotion: Dict) -> Optional[str]:
+        """Reuse the crisis scan from EmotionRecognition when the emotion dict carries it."""
+        if "crisis_detected" in emotion:
+            return emotion.get("crisis_type")
+        return self._detect_crisis(message)
+    
+    def _build_routing_table(self):
+        """Precompile every canned-response keyword into one automaton.
+
+        Each keyword keeps the rank of its first appearance across the
+        keyword responses, the original responses and the knowledge hints,
+        so the lowest-ranked hit reproduces the old sequential scans.
+        """
+        self._fallback_routes = {}  # keyword -> (rank, response)
+        fallback_tables = [
+            self.keyword_responses.items(),
+            ((key, response) for key, response in self.responses.items() if key != 'default'),
+            ((keyword, f"{self.responses['default']} {info}") for keyword, info in self.knowledge_keywords.items())
+        ]
+        rank = 0
+        for table in fallback_tables:
+            for keyword, response in table:
+                if keyword not in self._fallback_routes:
+                    self._fallback_routes[keyword] = (rank, response)
+                rank += 1
         
-        for crisis_type, keywords in self.crisis_keywords.items():
+        self._shortcut_routes = {}  # keyword -> shortcut index
+        self._shortcut_labels = {}  # emotion label -> shortcut index
+        for index, (label, keywords, _) in enumerate(self.emotion_shortcuts):
+            self._shortcut_labels.setdefault(label, index)
             for keyword in keywords:
-                if keyword in message_lower:
-                    return crisis_type
+                self._shortcut_routes.setdefault(keyword, index)
         
-        return None
+        self._feeling_words = set(self.feeling_words)
+        self._route_matcher = PhraseMatcher(
+            list(self._fallback_routes) + list(self._shortcut_routes) + self.feeling_words)
+    
+    def _route_emotion_shortcut(self, matched: set, emotion: Dict) -> Optional[str]:
+        """Pick the emotion shortcut response, if the label or a keyword triggers one."""
+        # Use multimodal emotion data if available
+        emotion_label = emotion.get('multimodal_emotion', emotion.get('label', 'neutral'))
+        # The cut-off is on the single-label scale of the text confidence; the
+        # fused multimodal_confidence is spread over all emotions and runs lower
+        emotion_confidence = emotion.get('confidence', 0.5)
+        
+        # Adjust response based on emotion detection (lower threshold)
+        if emotion_confidence <= 0.3:  # Lowered from 0.7
+            return None
+        
+        candidates = [self._shortcut_routes[keyword] for keyword in matched if keyword in self._shortcut_routes]
+        if emotion_label in self._shortcut_labels:
+            candidates.append(self._shortcut_labels[emotion_label])
+        if not candidates:
+            return None
+        return self.emotion_shortcuts[min(candidates)][2]
+    
+    def _route_fallback(self, message_lower: str, matched: set) -> str:
+        """Pick the canned response used when the LLM does not answer."""
+        hits = [self._fallback_routes[keyword] for keyword in matched if keyword in self._fallback_routes]
+        if hits:
+            return min(hits)[1]
+        
+        # Enhanced default responses based on message length and content
+        if len(message_lower.split()) <= 2:  # Very short responses
+            return "I hear you. Can you tell me more about that?"
+        elif '?' in message_lower:  # Questions
+            return "That's a good question. How are you feeling about it?"
+        elif matched & self._feeling_words:
+            return "Thanks for sharing how you're feeling. Can you tell me more about what's causing that?"
+        return self.responses['default']
+    
+    def route(self, message: str, emotion: Optional[Dict] = None) -> str:
+        """Resolve the canned response for a message without calling the LLM."""
+        message_lower = message.lower().strip()
+        matched = self._route_matcher.find_keywords(message_lower)
+        
+        if emotion is not None:
+            response = self._route_emotion_shortcut(matched, emotion)
+            if response:
+                return response
+        
+        return self._route_fallback(message_lower, matched)
     
     def _generate_crisis_response(self, crisis_type: str) -> str:
         """Generate appropriate crisis response."""
@@ -120,127 +329,38 @@ class Chatbot:
     async def generate_response(self, message: str, user_id: str, emotion: Dict, context: Optional[Dict] = None) -> str:
         try:
             # First, check for crisis keywords
-            crisis_type = self._detect_crisis(message)
+            crisis_type = self._crisis_type_for(message, emotion)
             if crisis_type:
                 return self._generate_crisis_response(crisis_type)
             
             message_lower = message.lower().strip()
             
-            # Use multimodal emotion data if available
-            multimodal_emotion = emotion.get('multimodal_emotion', emotion.get('label', 'neutral'))
-            multimodal_confidence = emotion.get('multimodal_confidence', emotion.get('confidence', 0.5))
+            # One automaton pass resolves every routing keyword in the message
+            matched = self._route_matcher.find_keywords(message_lower)
             
-            # Adjust response based on emotion detection (lower threshold)
-            if multimodal_confidence > 0.3:  # Lowered from 0.7
-                if multimodal_emotion == 'sad' or 'sad' in message_lower or 'down' in message_lower or 'depressed' in message_lower:
-                    response = "I can sense you're feeling down. Would you like to talk about what's bothering you?"
-                    self._store_conversation(
-                        user_id, message, response, emotion)
-                    return response
-                elif multimodal_emotion == 'anxious' or 'anxious' in message_lower or 'anxiety' in message_lower or 'worried' in message_lower:
-                    response = "I hear that you're feeling anxious. Let's try some calming techniques together."
-                    self._store_conversation(
-                        user_id, message, response, emotion)
-                    return response
-                elif multimodal_emotion == 'angry' or 'angry' in message_lower or 'frustrated' in message_lower or 'upset' in message_lower:
-                    response = "I hear frustration in your words. Can you tell me what's upsetting you?"
-                    self._store_conversation(
-                        user_id, message, response, emotion)
-                    return response
-                elif multimodal_emotion == 'happy' or 'happy' in message_lower or 'good' in message_lower or 'great' in message_lower:
-                    response = "I can hear the positivity! That's wonderful. What's making you feel good?"
-                    self._store_conversation(
-                        user_id, message, response, emotion)
-                    return response
-
-            # Try Gemini AI response first if available
-            gemini_response = self._generate_gemini_response(
+            # Emotion shortcuts answer before the LLM
+            response = self._route_emotion_shortcut(matched, emotion)
+            if response:
+                self._store_conversation(
+                    user_id, message, response, emotion)
+                return response
+
+            # Try Gemini AI response first if available; in hedged mode the
+            # canned answer below wins once the latency budget is spent
+            llm_call = self._generate_gemini_response(
                 message, user_id, emotion, context)
+            if self.llm_hedge_budget is not None:
+                gemini_response = await self._hedged_llm_response(llm_call)
+            else:
+                gemini_response = await llm_call
             if gemini_response:
                 # Store conversation for digital twin learning
                 self._store_conversation(
                     user_id, message, gemini_response, emotion)
                 return gemini_response
 
-            # Enhanced keyword matching with more flexible patterns
-            keyword_responses = {
-                'hello': self.responses['hello'],
-                'hi': self.responses['hello'],
-                'hey': self.responses['hello'],
-                'stressed': self.responses['stressed'],
-                'stress': self.responses['stressed'],
-                'tensed': self.responses['stressed'],
-                'tense': self.responses['stressed'],
-                'anxious': self.responses['anxious'],
-                'anxiety': self.responses['anxious'],
-                'worried': self.responses['anxious'],
-                'sad': self.responses['sad'],
-                'down': self.responses['sad'],
-                'depressed': self.responses['sad'],
-                'angry': self.responses['angry'],
-                'mad': self.responses['angry'],
-                'upset': self.responses['angry'],
-                'frustrated': self.responses['angry'],
-                'lonely': self.responses['lonely'],
-                'alone': self.responses['lonely'],
-                'tired': self.responses['tired'],
-                'exhausted': self.responses['tired'],
-                'sleep': "Getting enough sleep is crucial for mental health. How has your sleep been lately?",
-                'exercise': "Regular physical activity can help improve your mood. Have you been able to exercise?",
-                'breathe': "Try this breathing exercise: inhale for 4 counts, hold for 4, exhale for 4. Would you like me to guide you through it?",
-                'help': self.responses['help'],
-                'okay': "I understand. Sometimes it's hard to find the right words. I'm here whenever you're ready to talk.",
-                'fine': "If you say you're fine, I'll believe you, but I'm here if you want to talk about anything.",
-                'good': "That's good to hear! What made today good for you?",
-                'bad': "I'm sorry to hear that. Would you like to talk about what's making things difficult?",
-                'terrible': "That sounds really tough. I'm here to listen if you want to share.",
-                'awful': "I'm sorry you're going through this. Your feelings are valid, and I'm here to support you.",
-                'scared': "Feeling scared can be really overwhelming. What's frightening you right now?",
-                'afraid': "It's okay to feel afraid sometimes. Can you tell me more about what's scaring you?",
-                'overwhelmed': "Feeling overwhelmed is completely understandable. Let's break this down together.",
-                'confused': "Confusion can be really unsettling. What feels unclear to you right now?",
-                'lost': "Feeling lost is a common experience. I'm here to help you find your way.",
-                'hopeless': "Even when things feel hopeless, there are always options and people who care. You're not alone.",
-                'worthless': "You are absolutely not worthless. Your life has value, and there are people who care about you.",
-                'useless': "That's not true at all. Everyone has worth and purpose. Let's talk about your strengths.",
-                'hate': "Hate is a strong emotion. Can you tell me what's making you feel this way?",
-                'hate myself': "I'm really concerned when I hear someone say they hate themselves. You deserve kindness and compassion.",
-                'suicidal': "I'm really concerned about what you're saying. Your safety is the most important thing right now. Please reach out to emergency services immediately: National Suicide Prevention Lifeline: 988 (24/7)",
-            }
-
-            # Check for enhanced keywords
-            for keyword, response in keyword_responses.items():
-                if keyword in message_lower:
-                    # Store conversation for digital twin learning
-                    self._store_conversation(
-                        user_id, message, response, emotion)
-                    return response
-            
-            # Check for original keywords as fallback
-            for key, response in self.responses.items():
-                if key in message_lower and key != 'default':
-                    # Store conversation for digital twin learning
-                    self._store_conversation(
-                        user_id, message, response, emotion)
-                    return response
-            
-            # Try to get relevant info from knowledge base
-            relevant_info = self._get_relevant_info(message_lower)
-            if relevant_info:
-                response = f"{self.responses['default']} {relevant_info}"
-                # Store conversation for digital twin learning
-                self._store_conversation(user_id, message, response, emotion)
-                return response
-
-            # Enhanced default responses based on message length and content
-            if len(message_lower.split()) <= 2:  # Very short responses
-                response = "I hear you. Can you tell me more about that?"
-            elif '?' in message_lower:  # Questions
-                response = "That's a good question. How are you feeling about it?"
-            elif any(word in message_lower for word in ['feel', 'feeling', 'felt', 'feels']):
-                response = "Thanks for sharing how you're feeling. Can you tell me more about what's causing that?"
-            else:
-                response = self.responses['default']
+            # Canned fallback from the precompiled routing table
+            response = self._route_fallback(message_lower, matched)
             
             # Store conversation for digital twin learning
             self._store_conversation(user_id, message, response, emotion)
@@ -250,27 +370,46 @@ class Chatbot:
             print(f"Error generating response: {e}")
             return "I'm sorry, I'm having trouble processing your message right now. Please try again."
     
-    def _get_relevant_info(self, message: str) -> str:
-        """Get relevant information based on keywords in the message."""
-        # Simple keyword matching for demo
-        keywords = {
-            'sleep': "Getting enough sleep is crucial for mental health.",
-            'exercise': "Regular physical activity can help improve your mood.",
-            'breathe': "Try this breathing exercise: inhale for 4, hold for 4, exhale for 4.",
-            'help': "Remember, it's okay to ask for help when you need it.",
-            'stress': "When stressed, try to break down tasks into smaller steps.",
-            'anxiety': "For anxiety, grounding techniques like naming 5 things you can see can help.",
-            'sad': "It's normal to feel sad sometimes. Talking about it can help.",
-            'happy': "That's wonderful! What makes you feel happy?",
-            'friend': "Having supportive friends is so important for mental health."
-        }
-        
-        for keyword, info in keywords.items():
-            if keyword in message:
-                return info
-        
-        return ""
+    async def stream_response(self, message: str, user_id: str, emotion: Dict, context: Optional[Dict] = None) -> AsyncIterator[str]:
+        """Yield the reply in pieces; Gemini output is forwarded as it arrives.
 
+        Crisis, shortcut and fallback replies are yielded as a single piece,
+        so the caller can treat every reply as a stream.
+        """
+        try:
+            # Crisis responses short-circuit before anything else
+            crisis_type = self._crisis_type_for(message, emotion)
+            if crisis_type:
+                yield self._generate_crisis_response(crisis_type)
+                return
+            
+            message_lower = message.lower().strip()
+            matched = self._route_matcher.find_keywords(message_lower)
+            
+            response = self._route_emotion_shortcut(matched, emotion)
+            if response:
+                self._store_conversation(user_id, message, response, emotion)
+                yield response
+                return
+            
+            parts = []
+            async for chunk in self._stream_gemini_response(message, user_id, emotion, context):
+                parts.append(chunk)
+                yield chunk
+            
+            if parts:
+                self._store_conversation(user_id, message, "".join(parts).strip(), emotion)
+                return
+            
+            # Gemini unavailable or too slow before the first chunk
+            response = self._route_fallback(message_lower, matched)
+            self._store_conversation(user_id, message, response, emotion)
+            yield response
+            
+        except Exception as e:
+            print(f"Error streaming response: {e}")
+            yield "I'm sorry, I'm having trouble processing your message right now. Please try again."
+    
     def _store_conversation(self, user_id: str, user_message: str, bot_response: str, emotion: Dict):
         """Store conversation for digital twin learning."""
         if user_id not in self.conversation_history:
@@ -287,9 +426,16 @@ class Chatbot:
             'confidence': emotion.get('confidence', 0.5),
             'timestamp': str(__import__('time').time())
         })
+        evicted = self.prompt_builder.add_turn(user_id, user_message, bot_response)
+        if evicted:
+            self.summarizer.add_evicted(user_id, evicted)
 
-    def _get_conversation_context(self, user_id: str, max_turns: int = 5) -> str:
+    def _get_conversation_context(self, user_id: str, max_turns: Optional[int] = None) -> str:
         """Get recent conversation context for personalized responses."""
+        if max_turns is None:
+            # Incrementally maintained and held to the prompt budget
+            return self.prompt_builder.get_context(user_id)
+
         if user_id not in self.conversation_history:
             return ""
 
@@ -302,47 +448,249 @@ class Chatbot:
 
         return "\n".join(context_parts)
 
-    def _generate_gemini_response(self, message: str, user_id: str, emotion: Dict, context: Optional[Dict] = None) -> Optional[str]:
+    def _build_gemini_prompt(self, message: str, user_id: str, emotion: Dict) -> str:
+        """Render the full Gemini prompt for a message."""
+        return self.prompt_builder.build(
+            user_id,
+            message,
+            emotion.get('label', 'neutral'),
+            emotion.get('confidence', 0.5)
+        )
+
+    def _response_cache_key(self, prompt: str, message: str, user_id: str, emotion: Dict) -> str:
+        """Hash the rendered prompt, or its normalized parts, into a cache key."""
+        if self.llm_cache_key == "normalized":
+            # Ignore the confidence figure, letter case and whitespace
+            raw = "\x1f".join([
+                GEMINI_SYSTEM_PROMPT,
+                emotion.get('label', 'neutral'),
+                self.prompt_builder.get_summary(user_id),
+                self._get_conversation_context(user_id),
+                " ".join(message.lower().split())
+            ])
+        else:
+            raw = prompt
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def _cached_response(self, key: str) -> Optional[str]:
+        """Cached reply for a key; SQLite lookups run on the default executor."""
+        if self.response_cache is None:
+            return None
+        if isinstance(self.response_cache, DiskCache):
+            return await asyncio.get_running_loop().run_in_executor(None, self.response_cache.get, key)
+        return self.response_cache.get(key)
+
+    async def _cache_response(self, key: str, response: str):
+        if self.response_cache is None:
+            return
+        if isinstance(self.response_cache, DiskCache):
+            await asyncio.get_running_loop().run_in_executor(None, self.response_cache.set, key, response)
+        else:
+            self.response_cache.set(key, response)
+
+    def _call_gemini(self, prompt: str) -> str:
+        """Blocking backend call; only ever run on the LLM executor."""
+        return self.llm_backend.generate(prompt).strip()
+
+    def _release_llm_slot(self, future: asyncio.Future):
+        # The slot is held until the worker thread really finishes, even if
+        # the caller already gave up, so the executor queue stays bounded
+        self.llm_metrics["in_flight"] -= 1
+        self._llm_slots.release()
+
+    def _open_gemini_stream(self, prompt: str):
+        """Start a streaming backend call; only ever run on the LLM executor."""
+        return iter(self.llm_backend.stream(prompt))
+
+    def _next_gemini_chunk(self, chunks) -> Optional[str]:
+        return next(chunks, None)
+
+    async def _generate_gemini_response(self, message: str, user_id: str, emotion: Dict, context: Optional[Dict] = None) -> Optional[str]:
         """Generate response using Gemini AI with conversation context."""
         try:
-            if not self.gemini_available or not self.gemini_model:
+            if self.llm_backend is None:
                 return None
 
-            # Get conversation history
-            conversation_context = self._get_conversation_context(user_id)
+            full_prompt = self._build_gemini_prompt(message, user_id, emotion)
+            prompt_key = self._response_cache_key(full_prompt, message, user_id, emotion)
 
-            # Build prompt with context
-            system_prompt = """You are Aura, an empathetic AI mental health companion for youth. You provide supportive, understanding responses while being mindful of mental health best practices.
+            cached = await self._cached_response(prompt_key)
+            if cached is not None:
+                return cached
 
-Key guidelines:
-- Be empathetic and non-judgmental
-- Encourage professional help when needed
-- Focus on active listening and validation
-- Provide practical coping strategies
-- Recognize crisis signs and direct to appropriate resources
-- Maintain appropriate boundaries as an AI companion
-
-Current user emotion analysis: {emotion_label} (confidence: {emotion_confidence})
-
-{conversation_context}
+            # Single-flight: an identical prompt already in flight is shared
+            shared = self._llm_inflight.get(prompt_key)
+            if shared is not None:
+                self.llm_metrics["coalesced"] += 1
+                return await asyncio.wait_for(asyncio.shield(shared), timeout=self.llm_timeout)
 
-Respond to the user's message in a supportive, contextual way that considers their conversation history and current emotional state."""
+            loop = asyncio.get_running_loop()
+            shared = loop.create_future()
+            self._llm_inflight[prompt_key] = shared
+            response = None
+            try:
+                # Waiting for a free slot counts towards the deadline
+                deadline = time.monotonic() + self.llm_timeout
+                await asyncio.wait_for(self._llm_slots.acquire(), timeout=self.llm_timeout)
 
-            emotion_label = emotion.get('label', 'neutral')
-            emotion_confidence = emotion.get('confidence', 0.5)
+                self.llm_metrics["in_flight"] += 1
+                if not self.circuit_breaker.allow():
+                    self.llm_metrics["short_circuited"] += 1
+                    self._release_llm_slot(None)
+                    return None
 
-            prompt = system_prompt.format(
-                emotion_label=emotion_label,
-                emotion_confidence=f"{emotion_confidence:.2f}",
-                conversation_context=f"Recent conversation:\n{conversation_context}" if conversation_context else "This is the start of the conversation."
-            )
+                self.llm_metrics["calls"] += 1
+                started = time.monotonic()
+                future = loop.run_in_executor(self._llm_executor, self._call_gemini, full_prompt)
+                future.add_done_callback(self._release_llm_slot)
 
-            # Add current message
-            full_prompt = f"{prompt}\n\nUser: {message}\n\nAssistant:"
+                remaining = max(deadline - started, 0)
+                try:
+                    response = await asyncio.wait_for(asyncio.shield(future), timeout=remaining)
+                except Exception:
+                    self.circuit_breaker.record_failure()
+                    raise
+                except BaseException:
+                    # Cancelled: no verdict on the provider, but free the probe
+                    self.circuit_breaker.release_probe()
+                    raise
+                self.circuit_breaker.record_success(time.monotonic() - started)
+            finally:
+                # Followers get None (and fall back) if this call failed
+                del self._llm_inflight[prompt_key]
+                shared.set_result(response)
 
-            response = self.gemini_model.generate_content(full_prompt)
-            return response.text.strip()
+            if response:
+                await self._cache_response(prompt_key, response)
+            return response
 
+        except asyncio.TimeoutError:
+            self.llm_metrics["timeouts"] += 1
+            print(f"Gemini call exceeded {self.llm_timeout}s deadline, using fallback response")
+            return None
         except Exception as e:
+            self.llm_metrics["errors"] += 1
             print(f"Gemini API error: {e}")
             return None
+
+    async def _stream_gemini_response(self, message: str, user_id: str, emotion: Dict, context: Optional[Dict] = None) -> AsyncIterator[str]:
+        """Stream Gemini output chunk by chunk.
+
+        Yields nothing when Gemini is unavailable, errors out or misses the
+        deadline before the first chunk; the deadline applies to each chunk.
+        Cached or coalesced replies are yielded as a single piece.
+        """
+        if self.llm_backend is None:
+            return
+
+        full_prompt = self._build_gemini_prompt(message, user_id, emotion)
+        prompt_key = self._response_cache_key(full_prompt, message, user_id, emotion)
+
+        cached = await self._cached_response(prompt_key)
+        if cached is not None:
+            yield cached
+            return
+
+        shared = self._llm_inflight.get(prompt_key)
+        if shared is not None:
+            self.llm_metrics["coalesced"] += 1
+            try:
+                response = await asyncio.wait_for(asyncio.shield(shared), timeout=self.llm_timeout)
+            except asyncio.TimeoutError:
+                self.llm_metrics["timeouts"] += 1
+                return
+            if response:
+                yield response
+            return
+
+        loop = asyncio.get_running_loop()
+        shared = loop.create_future()
+        self._llm_inflight[prompt_key] = shared
+        parts = []
+        try:
+            try:
+                await asyncio.wait_for(self._llm_slots.acquire(), timeout=self.llm_timeout)
+            except asyncio.TimeoutError:
+                self.llm_metrics["timeouts"] += 1
+                print(f"Gemini call exceeded {self.llm_timeout}s deadline, using fallback response")
+                return
+
+            self.llm_metrics["in_flight"] += 1
+            if not self.circuit_breaker.allow():
+                self.llm_metrics["short_circuited"] += 1
+                self._release_llm_slot(None)
+                return
+
+            self.llm_metrics["calls"] += 1
+            started = time.monotonic()
+            pending = None
+            try:
+                pending = loop.run_in_executor(self._llm_executor, self._open_gemini_stream, full_prompt)
+                chunks = await asyncio.wait_for(asyncio.shield(pending), timeout=self.llm_timeout)
+                first = True
+                while True:
+                    pending = loop.run_in_executor(self._llm_executor, self._next_gemini_chunk, chunks)
+                    chunk = await asyncio.wait_for(asyncio.shield(pending), timeout=self.llm_timeout)
+                    if chunk is None:
+                        break
+                    if first:
+                        chunk = chunk.lstrip()
+                    if chunk:
+                        first = False
+                        parts.append(chunk)
+                        yield chunk
+
+                self.circuit_breaker.record_success(time.monotonic() - started)
+                if parts:
+                    await self._cache_response(prompt_key, "".join(parts).strip())
+            except asyncio.TimeoutError:
+                self.circuit_breaker.record_failure()
+                self.llm_metrics["timeouts"] += 1
+                print(f"Gemini stream exceeded {self.llm_timeout}s deadline")
+            except Exception as e:
+                self.circuit_breaker.record_failure()
+                self.llm_metrics["errors"] += 1
+                print(f"Gemini API error: {e}")
+            except BaseException:
+                # Client disconnected (GeneratorExit) or cancelled mid-stream
+                self.circuit_breaker.release_probe()
+                raise
+            finally:
+                # Keep the slot until the worker thread is done with the stream
+                if pending is not None and not pending.done():
+                    pending.add_done_callback(self._release_llm_slot)
+                else:
+                    self._release_llm_slot(pending)
+        finally:
+            del self._llm_inflight[prompt_key]
+            shared.set_result("".join(parts).strip() or None)
+
+    async def _hedged_llm_response(self, llm_call) -> Optional[str]:
+        """Wait at most the hedge budget for the LLM reply.
+
+        On a miss the caller answers with the canned response; the LLM call
+        keeps running in the background so its reply still reaches the cache.
+        """
+        task = asyncio.ensure_future(llm_call)
+        done, _ = await asyncio.wait({task}, timeout=self.llm_hedge_budget)
+        if task in done:
+            return task.result()
+
+        self.llm_metrics["hedged"] += 1
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return None
+
+    def llm_stats(self) -> Dict:
+        """Concurrency, deadline, breaker and cache counters for LLM calls."""
+        return {
+            "available": self.gemini_available,
+            "backend": self.llm_backend.name if self.llm_backend is not None else None,
+            "max_in_flight": self.llm_max_in_flight,
+            "timeout": self.llm_timeout,
+            "hedge_budget": self.llm_hedge_budget,
+            **self.llm_metrics,
+            "inflight_prompts": len(self._llm_inflight),
+            "circuit_breaker": self.circuit_breaker.stats(),
+            "cache": self.response_cache.stats() if self.response_cache is not None else {"enabled": False}
+        }
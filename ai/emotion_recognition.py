@@ -1,26 +1,84 @@
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import asyncio
+import copy
+import hashlib
+import io
+import json
+import os
+import tempfile
+from ai.analysis_pool import AnalysisPool
+from ai.cache import TTLCache, build_cache, file_digest
+from ai.fusion import FusionEngine, label_distribution
+from ai.keyword_matcher import KeywordMatcher, default_matcher
+
+# Bump when analyze_audio/analyze_video change, to invalidate cached results
+AUDIO_ANALYZER_VERSION = 5
+VIDEO_ANALYZER_VERSION = 4
 
 class EmotionRecognition:
-    def __init__(self):
-        # Crisis detection keywords
-        self.crisis_keywords = {
-            'suicide': ['suicide', 'kill myself', 'end it all', 'not worth living', 'better off dead'],
-            'self_harm': ['cut myself', 'hurt myself', 'self harm', 'self-harm', 'burn myself'],
-            'emergency': ['emergency', 'crisis', 'help me now', 'i can\'t take it', 'breaking point'],
-            'hopeless': ['no hope', 'hopeless', 'nothing matters', 'give up', 'end everything'],
-            'panic': ['panic attack', 'can\'t breathe', 'heart racing', 'freaking out', 'losing control']
+    def __init__(self, matcher: Optional[KeywordMatcher] = None,
+                 cache_size: Optional[int] = None, cache_ttl: Optional[float] = None,
+                 media_cache_backend: Optional[str] = None, fusion: Optional[FusionEngine] = None):
+        # Shared lexicon automaton (also used by Chatbot)
+        self.matcher = matcher if matcher is not None else default_matcher
+        self.crisis_keywords = self.matcher.crisis_keywords
+        self.emotion_keywords = self.matcher.emotion_keywords
+        
+        # Probability-level fusion of text, audio and video (weights from FUSION_WEIGHTS)
+        self.fusion = fusion if fusion is not None else FusionEngine()
+        
+        # Opt-in LRU/TTL cache for analyze_text (disabled when size is 0)
+        if cache_size is None:
+            cache_size = int(os.getenv("EMOTION_CACHE_SIZE", "0"))
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv("EMOTION_CACHE_TTL", "300"))
+        self.text_cache = TTLCache(max_size=cache_size, ttl=cache_ttl or None) if cache_size > 0 else None
+        
+        # Audio is analysed block by block; 0 seconds means the whole recording
+        self.audio_max_duration = float(os.getenv("AUDIO_MAX_DURATION", "30"))
+        self.audio_block_frames = int(os.getenv("AUDIO_BLOCK_FRAMES", "256"))
+        # "accurate" runs YIN at 22.05 kHz; "fast" uses autocorrelation at 8 kHz
+        self.audio_quality = os.getenv("AUDIO_QUALITY", "accurate").lower()
+        
+        # Video frames sampled per clip (0 = no cap) and their analysis width
+        self.video_max_frames = int(os.getenv("VIDEO_MAX_FRAMES", "60"))
+        self.video_sample_width = int(os.getenv("VIDEO_SAMPLE_WIDTH", "160"))
+        # Samples further apart than this many seconds are seeked to, not read through
+        self.video_seek_gap = float(os.getenv("VIDEO_SEEK_GAP", "0.5"))
+        
+        # Seconds a multimodal request waits for each modality before replying without it
+        self.modality_timeouts = {
+            "audio": float(os.getenv("MULTIMODAL_AUDIO_TIMEOUT", "20")) or None,
+            "video": float(os.getenv("MULTIMODAL_VIDEO_TIMEOUT", "30")) or None
         }
+        # Analyses that outlived their timeout, kept referenced until they finish
+        self._late_analyses = set()
         
-        # Simple keyword-based emotion detection for demo
-        self.emotion_keywords = {
-            "sad": ["sad", "depressed", "unhappy", "down", "blue", "heartbroken", "lonely"],
-            "anxious": ["anxious", "worried", "nervous", "scared", "fear", "panic", "stressed"],
-            "angry": ["angry", "mad", "furious", "irritated", "annoyed", "frustrated"],
-            "happy": ["happy", "joy", "excited", "great", "wonderful", "amazing", "good"],
-            "tired": ["tired", "exhausted", "fatigued", "sleepy", "drained"],
-            "confused": ["confused", "lost", "unsure", "bewildered", "puzzled"],
-            "hopeful": ["hopeful", "optimistic", "positive", "encouraged"]
+        # Audio/video results keyed by file content and analyzer settings
+        if media_cache_backend is None:
+            media_cache_backend = os.getenv("MEDIA_CACHE_BACKEND", "disk")
+        self.media_cache = build_cache(
+            media_cache_backend,
+            max_size=int(os.getenv("MEDIA_CACHE_SIZE", "1024")),
+            path=os.getenv("MEDIA_CACHE_PATH", "cache/media_analysis.sqlite3"),
+            max_bytes=int(os.getenv("MEDIA_CACHE_MAX_BYTES", "10000000")) or None
+        )
+        self._media_fingerprints = {
+            "audio": self._fingerprint({
+                "version": AUDIO_ANALYZER_VERSION,
+                "max_duration": self.audio_max_duration,
+                "block_frames": self.audio_block_frames,
+                "quality": self.audio_quality
+            }),
+            "video": self._fingerprint({
+                "version": VIDEO_ANALYZER_VERSION,
+                "max_frames": self.video_max_frames,
+                "sample_width": self.video_sample_width,
+                "seek_gap": self.video_seek_gap
+            })
         }
+        # Content digests by (path, size, mtime), so unchanged files are hashed once
+        self._digests = TTLCache(max_size=512)
         
         # Default emotion scores
         self.default_scores = {
@@ -35,28 +93,117 @@ class EmotionRecognition:
     
     def detect_crisis(self, text: str) -> Optional[str]:
         """Detect if the text contains crisis-related keywords."""
-        text_lower = text.lower()
-        
-        for crisis_type, keywords in self.crisis_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    return crisis_type
+        return self.matcher.scan(text)["crisis_type"]
+    
+    def cache_stats(self) -> Dict:
+        """Hit/miss counters of the analyze_text cache, for monitoring."""
+        if self.text_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.text_cache.stats()}
+    
+    def media_cache_stats(self) -> Dict:
+        """Hit/miss counters of the audio/video result cache."""
+        if self.media_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.media_cache.stats()}
+    
+    def _fingerprint(self, settings: Dict) -> str:
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    
+    def _digest_key(self, path: str) -> Tuple:
+        stat = os.stat(path)
+        return (path, stat.st_size, stat.st_mtime_ns)
+    
+    def remember_digest(self, path: str, digest: str):
+        """Record a SHA-256 already computed for `path` (e.g. while uploading)."""
+        try:
+            self._digests.set(self._digest_key(path), digest)
+        except OSError:
+            pass
+    
+    def media_cache_key(self, kind: str, path: Union[str, bytes], digest: Optional[str] = None) -> Optional[str]:
+        """Cache key from the content hash (of a file, or in-memory bytes) and the analyzer settings."""
+        if self.media_cache is None:
+            return None
+        if digest is not None:
+            return f"{kind}:{self._media_fingerprints[kind]}:{digest}"
+        if isinstance(path, bytes):
+            return f"{kind}:{self._media_fingerprints[kind]}:{hashlib.sha256(path).hexdigest()}"
+        try:
+            stat_key = self._digest_key(path)
+            digest = self._digests.get(stat_key)
+            if digest is None:
+                digest = file_digest(path)
+                self._digests.set(stat_key, digest)
+        except OSError:
+            # Missing files are left to the analyzer to report
+            return None
+        return f"{kind}:{self._media_fingerprints[kind]}:{digest}"
+    
+    def _media_cache_lookup(self, kind: str, path: Union[str, bytes],
+                            digest: Optional[str] = None) -> Tuple[Optional[str], Optional[Dict]]:
+        key = self.media_cache_key(kind, path, digest)
+        return key, (self.media_cache.get(key) if key else None)
+    
+    def _media_cache_store(self, key: Optional[str], result: Dict):
+        # Failed analyses are not cached, so they are retried next time
+        if key and "error" not in result:
+            self.media_cache.set(key, copy.deepcopy(result))
+    
+    def _cached_media_analysis(self, kind: str, path: Union[str, bytes], analyze: Callable[[str], Dict]) -> Dict:
+        key, cached = self._media_cache_lookup(kind, path)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        result = self._analyze_bytes(path, analyze) if isinstance(path, bytes) else analyze(path)
+        self._media_cache_store(key, result)
+        return result
+    
+    def _analyze_bytes(self, data: bytes, analyze: Callable) -> Dict:
+        """Analyse in-memory media, touching disk only if the decoder needs a real file.
         
-        return None
+        soundfile and OpenCV's FFmpeg backend read straight from a buffer;
+        formats or builds that cannot (e.g. m4a via audioread) are retried
+        from a temporary file.
+        """
+        result = analyze(io.BytesIO(data))
+        if "error" not in result:
+            return result
+        fd, temp_path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            return analyze(temp_path)
+        finally:
+            os.remove(temp_path)
     
     def analyze_text(self, text: str) -> Dict:
+        """Analyze text emotion, served from the cache when it is enabled.
+
+        The cache is keyed on lowercased, stripped text (analysis is
+        case-insensitive) and always hands out deep copies, since callers
+        mutate the returned dict.
+        """
+        if self.text_cache is None:
+            return self._analyze_text(text)
+        
+        key = text.lower().strip()
+        cached = self.text_cache.get(key)
+        if cached is None:
+            cached = self._analyze_text(key)
+            self.text_cache.set(key, cached)
+        return copy.deepcopy(cached)
+    
+    def _analyze_text(self, text: str) -> Dict:
         try:
-            text_lower = text.lower()
             scores = self.default_scores.copy()
             
-            # Check for crisis first
-            crisis_type = self.detect_crisis(text)
+            # Single pass over the text for crisis and emotion keywords
+            scan = self.matcher.scan(text)
+            crisis_type = scan["crisis_type"]
             
             # Count keyword matches
-            for emotion, keywords in self.emotion_keywords.items():
-                for keyword in keywords:
-                    if keyword in text_lower:
-                        scores[emotion] += 0.2
+            for emotion, count in scan["emotion_counts"].items():
+                scores[emotion] += 0.2 * count
             
             # Normalize scores
             total = sum(scores.values())
@@ -70,7 +217,9 @@ class EmotionRecognition:
             result = {
                 "label": top_emotion[0] if top_emotion[1] > 0.1 else "neutral",
                 "confidence": top_emotion[1] if top_emotion[1] > 0.1 else 0.5,
-                "all_scores": scores
+                "all_scores": scores,
+                "crisis_detected": False,
+                "crisis_type": None
             }
             
             # Add crisis information if detected
@@ -90,58 +239,85 @@ class EmotionRecognition:
                 "all_scores": self.default_scores.copy()
             }
     
-    def analyze_audio(self, audio_path: str) -> Dict:
-        """Basic audio emotion analysis using librosa."""
+    def analyze_texts(self, texts: List[str]) -> List[Dict]:
+        """Score many texts at once with the same semantics as analyze_text.
+
+        Keyword hits are collected into a documents x emotions count matrix
+        which is normalized in a single NumPy pass.
+        """
         try:
-            import librosa
             import numpy as np
             
-            # Load audio file
-            y, sr = librosa.load(audio_path, duration=30)  # Limit to 30 seconds
+            emotions = list(self.default_scores.keys())
+            emotion_index = {emotion: i for i, emotion in enumerate(emotions)}
             
-            # Extract basic audio features
-            # Pitch/fundamental frequency
-            f0 = librosa.yin(y, fmin=float(librosa.note_to_hz('C2')), fmax=float(librosa.note_to_hz('C7')))
-            f0_mean = np.mean(f0[f0 > 0]) if np.any(f0 > 0) else 0
+            # One automaton pass per text fills the count matrix
+            scans = [self.matcher.scan(text) for text in texts]
+            counts = np.zeros((len(texts), len(emotions)))
+            for row, scan in enumerate(scans):
+                for emotion, count in scan["emotion_counts"].items():
+                    counts[row, emotion_index[emotion]] = count
             
-            # Energy/RMS
-            rms = librosa.feature.rms(y=y)
-            rms_mean = np.mean(rms)
+            # Normalize scores
+            scores = counts * 0.2
+            totals = scores.sum(axis=1, keepdims=True)
+            scores = np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
             
-            # Spectral centroid (brightness)
-            centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
-            centroid_mean = np.mean(centroid)
+            # Get top emotion (argmax keeps the first emotion on ties, like max())
+            top_index = scores.argmax(axis=1)
+            top_score = scores[np.arange(len(texts)), top_index]
             
-            # Zero crossing rate (noise vs tonal)
-            zcr = librosa.feature.zero_crossing_rate(y)
-            zcr_mean = np.mean(zcr)
+            results = []
+            for row, scan in enumerate(scans):
+                has_emotion = top_score[row] > 0.1
+                result = {
+                    "label": emotions[top_index[row]] if has_emotion else "neutral",
+                    "confidence": float(top_score[row]) if has_emotion else 0.5,
+                    "all_scores": dict(zip(emotions, scores[row].tolist())),
+                    "crisis_detected": False,
+                    "crisis_type": None
+                }
+                
+                # Add crisis information if detected
+                if scan["crisis_type"]:
+                    result["crisis_detected"] = True
+                    result["crisis_type"] = scan["crisis_type"]
+                    result["label"] = "crisis"
+                    result["confidence"] = 0.95
+                
+                results.append(result)
             
-            # Simple emotion classification based on audio features
-            emotion = "neutral"
-            confidence = 0.5
+            return results
+        
+        except Exception as e:
+            print(f"Error in batch emotion analysis: {e}")
+            return [self.analyze_text(text) for text in texts]
+    
+    def analyze_audio(self, audio_path: Union[str, bytes]) -> Dict:
+        """Audio emotion analysis of a file or its bytes, served from the media cache when it is enabled."""
+        return self._cached_media_analysis("audio", audio_path, self._analyze_audio)
+    
+    def _analyze_audio(self, audio_path: str) -> Dict:
+        """Basic audio emotion analysis using librosa."""
+        try:
+            from ai.audio_features import extract_audio_features, extract_audio_features_fast
             
-            # High pitch + high energy = excited/happy
-            if f0_mean > 200 and rms_mean > 0.1:
-                emotion = "excited"
-                confidence = 0.7
-            # Low pitch + low energy = sad/depressed
-            elif f0_mean < 150 and rms_mean < 0.05:
-                emotion = "sad"
-                confidence = 0.6
-            # High zero crossing + high energy = anxious/stressed
-            elif zcr_mean > 0.1 and rms_mean > 0.08:
-                emotion = "anxious"
-                confidence = 0.65
+            if self.audio_quality == "fast":
+                features = extract_audio_features_fast(audio_path, max_duration=self.audio_max_duration)
+            else:
+                # Stream the file in blocks so memory stays flat for long recordings
+                features = extract_audio_features(
+                    audio_path,
+                    max_duration=self.audio_max_duration,
+                    block_frames=self.audio_block_frames
+                )
+            emotion, confidence = self.classify_audio_features(features)
             
             return {
                 "emotion": emotion,
                 "confidence": confidence,
-                "features": {
-                    "pitch_mean": float(f0_mean),
-                    "energy_mean": float(rms_mean),
-                    "centroid_mean": float(centroid_mean),
-                    "zcr_mean": float(zcr_mean)
-                }
+                "probabilities": label_distribution(emotion, confidence),
+                "features": {key: float(value) for key, value in features.items()}
             }
             
         except Exception as e:
@@ -152,14 +328,39 @@ class EmotionRecognition:
                 "error": str(e)
             }
     
-    def analyze_video(self, video_path: str) -> Dict:
+    def classify_audio_features(self, features: Dict) -> Tuple[str, float]:
+        """Map summary audio features to an emotion label and confidence."""
+        f0_mean = features["pitch_mean"]
+        rms_mean = features["energy_mean"]
+        zcr_mean = features["zcr_mean"]
+        
+        # High pitch + high energy = excited/happy
+        if f0_mean > 200 and rms_mean > 0.1:
+            return "excited", 0.7
+        # Low pitch + low energy = sad/depressed
+        if f0_mean < 150 and rms_mean < 0.05:
+            return "sad", 0.6
+        # High zero crossing + high energy = anxious/stressed
+        if zcr_mean > 0.1 and rms_mean > 0.08:
+            return "anxious", 0.65
+        return "neutral", 0.5
+    
+    def analyze_video(self, video_path: Union[str, bytes]) -> Dict:
+        """Video emotion analysis of a file or its bytes, served from the media cache when it is enabled."""
+        return self._cached_media_analysis("video", video_path, self._analyze_video)
+    
+    def _analyze_video(self, video_path: str) -> Dict:
         """Basic video emotion analysis placeholder."""
         try:
             import cv2
-            import numpy as np
+            from ai.video_features import (FRAME_LABELS, collect_sampled_frames, frame_statistics, keyframe_indices,
+                                           label_frames, label_probabilities, sampling_interval, summarize_labels)
             
-            # Open video file
-            cap = cv2.VideoCapture(video_path)
+            # Open video file, or an in-memory stream (OpenCV 4.11+ FFmpeg backend)
+            if isinstance(video_path, io.BufferedIOBase):
+                cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [])
+            else:
+                cap = cv2.VideoCapture(video_path)
             
             if not cap.isOpened():
                 return {"emotion": "neutral", "confidence": 0.5, "error": "Could not open video file"}
@@ -169,48 +370,44 @@ class EmotionRecognition:
             frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             duration = frame_count / fps if fps > 0 else 0
             
-            # Sample frames (every 1 second)
-            emotions = []
-            frame_interval = int(fps) if fps > 0 else 30
-            
-            for i in range(0, min(frame_count, int(duration * fps)), frame_interval):
-                cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-                ret, frame = cap.read()
-                
-                if ret:
-                    # Convert to grayscale for basic analysis
-                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    
-                    # Simple brightness analysis (placeholder for facial emotion)
-                    brightness = np.mean(gray) / 255.0
-                    
-                    # Very basic emotion inference from brightness
-                    if brightness > 0.6:
-                        emotions.append("happy")
-                    elif brightness < 0.4:
-                        emotions.append("sad")
-                    else:
-                        emotions.append("neutral")
-            
+            # Sample frames (every 1 second, spread out to at most video_max_frames)
+            # into one downscaled grayscale buffer
+            frame_interval = sampling_interval(fps, frame_count, self.video_max_frames)
+            # Samples further apart than the seek gap are reached by seeking to keyframes
+            seek_gap = int(self.video_seek_gap * (fps if fps > 0 else 30))
+            keyframes = None
+            if seek_gap > 0 and frame_interval > seek_gap:
+                if isinstance(video_path, str):
+                    keyframes = keyframe_indices(video_path)
+                elif hasattr(video_path, "getvalue"):
+                    # A second stream over the same bytes; cap is reading the first
+                    keyframes = keyframe_indices(io.BytesIO(video_path.getvalue()))
+            indices, frames = collect_sampled_frames(cap, frame_interval, self.video_max_frames,
+                                                     self.video_sample_width, keyframes)
             cap.release()
             
+            # Simple brightness analysis (placeholder for facial emotion), all frames at once
+            stats = frame_statistics(frames)
+            labels = label_frames(stats["brightness"])
+            
             # Get most common emotion
-            if emotions:
-                from collections import Counter
-                most_common = Counter(emotions).most_common(1)[0]
-                emotion = most_common[0]
-                confidence = most_common[1] / len(emotions)
-            else:
-                emotion = "neutral"
-                confidence = 0.5
+            emotion, confidence = summarize_labels(labels)
             
             return {
                 "emotion": emotion,
                 "confidence": confidence,
+                "probabilities": label_probabilities(labels),
                 "video_info": {
                     "duration": duration,
                     "fps": fps,
-                    "frames_analyzed": len(emotions)
+                    "frames_analyzed": len(frames)
+                },
+                # Per-frame series for fusion; one entry per sampled frame
+                "frame_series": {
+                    "frame": indices.tolist(),
+                    "time": [round(float(i) / fps, 3) for i in indices] if fps > 0 else None,
+                    "brightness": [round(float(b), 4) for b in stats["brightness"]],
+                    "emotion": [FRAME_LABELS[label] for label in labels]
                 }
             }
             
@@ -226,35 +423,108 @@ class EmotionRecognition:
         """Analyze text, audio, and video for comprehensive emotion detection."""
         # Start with text analysis
         result = self.analyze_text(text)
+        audio_result = self.analyze_audio(audio_path) if audio_path else None
+        # For now, treat image as single frame video
+        video_result = self.analyze_video(image_path) if image_path else None
+        return self.combine_multimodal(result, audio_result, video_result)
+    
+    async def analyze_multimodal_async(self, text: str, audio_path: Optional[Union[str, bytes]] = None,
+                                       image_path: Optional[Union[str, bytes]] = None,
+                                       pool: Optional[AnalysisPool] = None,
+                                       digests: Optional[Dict[str, str]] = None,
+                                       timeouts: Optional[Dict[str, Optional[float]]] = None) -> Dict:
+        """analyze_multimodal with audio and video analysed concurrently on the analysis pool.
         
-        # Analyze audio if provided
-        if audio_path:
-            audio_result = self.analyze_audio(audio_path)
-            result["audio_analysis"] = audio_result
-            
-            # Combine emotions (simple weighted average)
-            if audio_result["confidence"] > 0.6:
-                # If audio confidence is high, adjust overall emotion
-                if audio_result["emotion"] != result["label"]:
-                    result["multimodal_emotion"] = audio_result["emotion"]
-                    result["multimodal_confidence"] = (result["confidence"] + audio_result["confidence"]) / 2
-                else:
-                    result["multimodal_confidence"] = max(result["confidence"], audio_result["confidence"])
+        Both are dispatched before the text is analysed inline, so latency is
+        that of the slowest modality rather than the sum. A modality still
+        running after its timeout (`timeouts`, else MULTIMODAL_*_TIMEOUT),
+        counting the file hashing for the media cache lookup, is left out
+        of the fusion, like a failed analysis; it finishes in the
+        background and its result is cached for the next request. Media may
+        be given as paths or as the files' bytes; `digests` maps
+        "audio"/"video" to SHA-256s already known for them.
+        """
+        pool = pool if pool is not None else AnalysisPool(max_workers=0)
+        digests = digests or {}
+        timeouts = {**self.modality_timeouts, **(timeouts or {})}
+        
+        pending = {}
+        for kind, path in (("audio", audio_path), ("video", image_path)):
+            if path:
+                pending[kind] = asyncio.ensure_future(
+                    self._analyze_on_pool(pool, kind, path, digests.get(kind), timeouts.get(kind))
+                )
+        if pending:
+            # Let the dispatches start before the inline text analysis
+            await asyncio.sleep(0)
+        
+        result = self.analyze_text(text)
+        if pending:
+            await asyncio.gather(*pending.values())
+        audio_result = pending["audio"].result() if "audio" in pending else None
+        video_result = pending["video"].result() if "video" in pending else None
+        return self.combine_multimodal(result, audio_result, video_result)
+    
+    async def _analyze_on_pool(self, pool: AnalysisPool, kind: str, path: Union[str, bytes],
+                               digest: Optional[str] = None, timeout: Optional[float] = None) -> Dict:
+        # The cache lookup hashes the whole file, so the deadline covers it too
+        analysis = asyncio.ensure_future(self._run_and_cache(pool, kind, path, digest))
+        try:
+            # Shielded, so a timeout stops the wait but not the analysis
+            return await asyncio.wait_for(asyncio.shield(analysis), timeout)
+        except asyncio.TimeoutError:
+            print(f"Error in {kind} analysis: no result within {timeout}s, replying without it")
+            self._late_analyses.add(analysis)
+            analysis.add_done_callback(self._late_analyses.discard)
+            return {
+                "emotion": "neutral",
+                "confidence": 0.5,
+                "error": f"{kind} analysis took longer than {timeout}s"
+            }
+    
+    async def _run_and_cache(self, pool: AnalysisPool, kind: str, path: Union[str, bytes],
+                             digest: Optional[str] = None) -> Dict:
+        # Hashing and SQLite lookups are blocking; keep them off the event loop
+        loop = asyncio.get_running_loop()
+        key, cached = await loop.run_in_executor(None, self._media_cache_lookup, kind, path, digest)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        try:
+            result = await pool.run(kind, path)
+        except Exception as e:
+            # Busy or stuck analysis degrades to text-only, like a failed analysis
+            print(f"Error in {kind} analysis: {e}")
+            return {
+                "emotion": "neutral",
+                "confidence": 0.5,
+                "error": str(e)
+            }
+        await loop.run_in_executor(None, self._media_cache_store, key, result)
+        return result
+    
+    def combine_multimodal(self, result: Dict, audio_result: Optional[Dict], video_result: Optional[Dict]) -> Dict:
+        """Fuse audio/video results into a text analysis result, in place.
         
-        # Analyze video if provided
-        if image_path:
-            # For now, treat image as single frame video
-            video_result = self.analyze_video(image_path)
+        The text's per-emotion scores and the audio/video probabilities are
+        combined by the FusionEngine; the fused label, its probability and
+        the full fused distribution are stored as multimodal_emotion,
+        multimodal_confidence and fused_scores. A crisis detected in the
+        text stays the overall label whatever the other modalities say.
+        """
+        if audio_result is not None:
+            result["audio_analysis"] = audio_result
+        if video_result is not None:
             result["video_analysis"] = video_result
-            
-            # Combine with existing analysis
-            if video_result["confidence"] > 0.6:
-                if "multimodal_emotion" in result:
-                    # Average all three modalities
-                    result["final_emotion"] = result["multimodal_emotion"]
-                    result["final_confidence"] = (result["multimodal_confidence"] + video_result["confidence"]) / 2
-                else:
-                    result["multimodal_emotion"] = video_result["emotion"]
-                    result["multimodal_confidence"] = (result["confidence"] + video_result["confidence"]) / 2
+        if audio_result is None and video_result is None:
+            return result
         
+        fused = self.fusion.fuse_results([result])[0]
+        if result.get("crisis_detected"):
+            result["multimodal_emotion"] = result["label"]
+            result["multimodal_confidence"] = result["confidence"]
+        else:
+            result["multimodal_emotion"] = fused["emotion"]
+            result["multimodal_confidence"] = fused["confidence"]
+        result["fused_scores"] = fused["scores"]
         return result
\ No newline at end of file
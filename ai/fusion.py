@@ -0,0 +1,122 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+
+import numpy as np
+
+# Fixed order of the emotion axis shared by every modality's probabilities
+EMOTIONS = ("neutral", "sad", "anxious", "angry", "happy", "tired", "confused", "hopeful", "excited")
+
+MODALITIES = ("text", "audio", "video")
+DEFAULT_WEIGHTS = {"text": 1.0, "audio": 0.8, "video": 0.5}
+
+
+def label_distribution(label: str, confidence: float) -> Dict[str, float]:
+    """Probabilities for a classifier that only yields a label: `confidence`
+    on that label and the remainder spread evenly over the other emotions."""
+    if label not in EMOTIONS:
+        label, confidence = "neutral", 0.5
+    rest = (1.0 - confidence) / (len(EMOTIONS) - 1)
+    return {emotion: (confidence if emotion == label else rest) for emotion in EMOTIONS}
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "text=1.0,audio=0.8,video=0.5"; unspecified modalities keep their default."""
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in spec.split(","):
+        if item.strip():
+            modality, _, weight = item.partition("=")
+            weights[modality.strip()] = float(weight)
+    return weights
+
+
+class FusionEngine:
+    """Weighted fusion of per-modality emotion probabilities.
+
+    Each modality contributes a probability vector over EMOTIONS; the fused
+    distribution is their weighted average over the modalities actually
+    present (a linear opinion pool), and the fused label is its argmax.
+    Samples are fused as one (samples, modalities, emotions) array with a
+    single einsum, so the cost is one array pass however many modalities,
+    emotions or samples there are. Only the weights are configuration
+    (FUSION_WEIGHTS), which makes the engine usable for re-scoring stored
+    analyses offline with different weights.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None,
+                 modalities: Sequence[str] = MODALITIES, emotions: Sequence[str] = EMOTIONS):
+        if weights is None:
+            weights = parse_weights(os.getenv("FUSION_WEIGHTS", ""))
+        self.modalities = tuple(modalities)
+        self.emotions = tuple(emotions)
+        self.weights = np.array([weights.get(modality, 0.0) for modality in self.modalities], dtype=np.float64)
+        self._index = {emotion: i for i, emotion in enumerate(self.emotions)}
+
+    def vector(self, probabilities: Optional[Dict[str, float]]) -> np.ndarray:
+        """Fixed-order vector of a {emotion: probability} mapping, normalised to sum to 1.
+
+        Emotions outside the axis are dropped; an empty or all-zero mapping
+        gives a zero vector, which fuse treats as a missing modality.
+        """
+        vector = np.zeros(len(self.emotions), dtype=np.float64)
+        for emotion, probability in (probabilities or {}).items():
+            index = self._index.get(emotion)
+            if index is not None:
+                vector[index] = probability
+        total = vector.sum()
+        return vector / total if total > 0 else vector
+
+    def modality_probabilities(self, record: Dict) -> List[Optional[Dict[str, float]]]:
+        """Per-modality probabilities of an analysis result, in `modalities` order.
+
+        `record` is shaped like analyze_multimodal's result: the text
+        analysis with optional "audio_analysis" and "video_analysis".
+        Failed analyses count as missing.
+        """
+        text = None
+        if "label" in record:
+            scores = record.get("all_scores") or {}
+            text = scores if sum(scores.values()) > 0 else label_distribution(record["label"], record["confidence"])
+
+        sources = {"text": text}
+        for modality in ("audio", "video"):
+            analysis = record.get(f"{modality}_analysis")
+            if analysis is not None and "error" not in analysis:
+                sources[modality] = analysis.get("probabilities") or label_distribution(
+                    analysis["emotion"], analysis["confidence"])
+        return [sources.get(modality) for modality in self.modalities]
+
+    def fuse(self, probabilities: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Fuse a (samples, modalities, emotions) array.
+
+        Returns the fused (samples, emotions) distributions, the label index
+        and the confidence (fused probability of that label) per sample.
+        Samples with no modality present come out neutral at 0.5.
+        """
+        present = probabilities.sum(axis=2) > 0
+        weights = present * self.weights
+        total = weights.sum(axis=1)
+        fused = np.einsum("sm,sme->se", weights, probabilities) / np.where(total > 0, total, 1.0)[:, np.newaxis]
+
+        labels = fused.argmax(axis=1)
+        confidence = fused[np.arange(len(fused)), labels]
+        empty = total <= 0
+        labels[empty] = self._index.get("neutral", 0)
+        confidence[empty] = 0.5
+        return fused, labels, confidence
+
+    def fuse_results(self, records: Sequence[Dict]) -> List[Dict]:
+        """Fuse many analysis results at once; see modality_probabilities for their shape."""
+        probabilities = np.zeros((len(records), len(self.modalities), len(self.emotions)), dtype=np.float64)
+        for row, record in enumerate(records):
+            for column, distribution in enumerate(self.modality_probabilities(record)):
+                probabilities[row, column] = self.vector(distribution)
+
+        fused, labels, confidence = self.fuse(probabilities)
+        return [
+            {
+                "emotion": self.emotions[labels[row]],
+                "confidence": float(confidence[row]),
+                "scores": dict(zip(self.emotions, fused[row].round(4).tolist()))
+            }
+            for row in range(len(records))
+        ]
@@ -0,0 +1,61 @@
+from typing import Dict, Optional
+import os
+import time
+import uuid
+
+from ai.cache import TTLCache
+
+
+class JobStore:
+    """In-memory registry of background jobs and their results.
+
+    A job moves from "queued" to "running" to "completed" or "failed".
+    Jobs live in a TTLCache, so at most `max_jobs` are kept and each is
+    dropped `ttl` seconds after its last update; clients are expected to
+    collect results well within that window.
+    """
+
+    def __init__(self, max_jobs: Optional[int] = None, ttl: Optional[float] = None):
+        if max_jobs is None:
+            max_jobs = int(os.getenv("JOB_MAX_JOBS", "1000"))
+        if ttl is None:
+            ttl = float(os.getenv("JOB_RESULT_TTL", "3600"))
+        self._jobs = TTLCache(max_size=max_jobs, ttl=ttl or None)
+        self.metrics = {"submitted": 0, "completed": 0, "failed": 0}
+
+    def create(self, owner: str, kind: str) -> Dict:
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "owner": owner,
+            "status": "queued",
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None
+        }
+        self._jobs.set(job["job_id"], job)
+        self.metrics["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self._jobs.get(job_id)
+
+    def update(self, job_id: str, **fields) -> Optional[Dict]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.update(fields, updated_at=time.time())
+        if fields.get("status") in ("completed", "failed"):
+            self.metrics[fields["status"]] += 1
+        # Re-store so the TTL counts from the latest update
+        self._jobs.set(job_id, job)
+        return job
+
+    def public_view(self, job: Dict) -> Dict:
+        """Job fields safe to return to clients."""
+        return {key: value for key, value in job.items() if key != "owner"}
+
+    def stats(self) -> Dict:
+        return {"stored": len(self._jobs), **self.metrics}
@@ -0,0 +1,135 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Crisis detection keywords, in priority order
+CRISIS_KEYWORDS = {
+    'suicide': ['suicide', 'kill myself', 'end it all', 'not worth living', 'better off dead'],
+    'self_harm': ['cut myself', 'hurt myself', 'self harm', 'self-harm', 'burn myself'],
+    'emergency': ['emergency', 'crisis', 'help me now', 'i can\'t take it', 'breaking point'],
+    'hopeless': ['no hope', 'hopeless', 'nothing matters', 'give up', 'end everything'],
+    'panic': ['panic attack', 'can\'t breathe', 'heart racing', 'freaking out', 'losing control']
+}
+
+# Simple keyword-based emotion detection for demo
+EMOTION_KEYWORDS = {
+    "sad": ["sad", "depressed", "unhappy", "down", "blue", "heartbroken", "lonely"],
+    "anxious": ["anxious", "worried", "nervous", "scared", "fear", "panic", "stressed"],
+    "angry": ["angry", "mad", "furious", "irritated", "annoyed", "frustrated"],
+    "happy": ["happy", "joy", "excited", "great", "wonderful", "amazing", "good"],
+    "tired": ["tired", "exhausted", "fatigued", "sleepy", "drained"],
+    "confused": ["confused", "lost", "unsure", "bewildered", "puzzled"],
+    "hopeful": ["hopeful", "optimistic", "positive", "encouraged"]
+}
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over a fixed set of phrases.
+
+    `find_keywords` reports every phrase occurring in the lowercased text in
+    one pass, with the same substring semantics as `phrase in text_lower`.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for phrase in dict.fromkeys(phrase.lower() for phrase in phrases):
+            state = 0
+            for char in phrase:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state].append(phrase)
+
+        # Breadth-first pass to fill failure links and merge outputs
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_keywords(self, text: str) -> set:
+        """Return the set of phrases occurring anywhere in the text."""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found = set()
+        state = 0
+
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+
+        return found
+
+
+class KeywordMatcher(PhraseMatcher):
+    """Phrase automaton over the crisis and emotion lexicons.
+
+    The automaton is built once; `scan` then finds every crisis and emotion
+    keyword in a single pass over the text.
+    """
+
+    def __init__(self, crisis_keywords: Optional[Dict[str, List[str]]] = None,
+                 emotion_keywords: Optional[Dict[str, List[str]]] = None):
+        self.crisis_keywords = crisis_keywords if crisis_keywords is not None else CRISIS_KEYWORDS
+        self.emotion_keywords = emotion_keywords if emotion_keywords is not None else EMOTION_KEYWORDS
+
+        # keyword -> list of (group, category) tags
+        self.tags: Dict[str, List[Tuple[str, str]]] = {}
+        for crisis_type, keywords in self.crisis_keywords.items():
+            for keyword in keywords:
+                self.tags.setdefault(keyword.lower(), []).append(('crisis', crisis_type))
+        for emotion, keywords in self.emotion_keywords.items():
+            for keyword in keywords:
+                self.tags.setdefault(keyword.lower(), []).append(('emotion', emotion))
+
+        super().__init__(self.tags.keys())
+
+    def scan(self, text: str) -> Dict:
+        """Scan the text once and return every crisis and emotion hit.
+
+        `crisis_type` is the first crisis category (in lexicon order) with a
+        hit, matching the old first-match behaviour. `emotion_counts` holds
+        the number of distinct keywords found per emotion.
+        """
+        crisis_hits: Dict[str, List[str]] = {}
+        emotion_hits: Dict[str, List[str]] = {}
+
+        for keyword in self.find_keywords(text):
+            for group, category in self.tags[keyword]:
+                hits = crisis_hits if group == 'crisis' else emotion_hits
+                hits.setdefault(category, []).append(keyword)
+
+        crisis_type = None
+        for category in self.crisis_keywords:
+            if category in crisis_hits:
+                crisis_type = category
+                break
+
+        return {
+            "crisis_type": crisis_type,
+            "crisis_hits": crisis_hits,
+            "emotion_hits": emotion_hits,
+            "emotion_counts": {emotion: len(keywords) for emotion, keywords in emotion_hits.items()}
+        }
+
+
+# Shared automaton used by both EmotionRecognition and Chatbot
+default_matcher = KeywordMatcher()
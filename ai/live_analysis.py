@@ -0,0 +1,150 @@
+from collections import deque
+from typing import Dict, Optional
+import threading
+
+import numpy as np
+
+from ai.emotion_recognition import EmotionRecognition
+from ai.fusion import label_distribution
+
+# Binary frames on the live socket start with one of these tags
+AUDIO_TAG = b"A"
+VIDEO_TAG = b"V"
+
+AUDIO_FORMATS = {"pcm_s16le": np.dtype("<i2"), "f32le": np.dtype("<f4")}
+
+# Limits on client-chosen audio settings; together they bound the pending buffer
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+MAX_BLOCK_SECONDS = 5.0
+MAX_CHUNK_SECONDS = 5.0
+
+
+class LiveSession:
+    """Running audio/video emotion estimate for one live capture.
+
+    Raw PCM chunks and JPEG frames are folded in as they arrive, with the
+    same feature logic as the upload path: audio goes through an
+    AudioFeatureAccumulator (resampled to the 22.05 kHz reference) in blocks
+    of about `block_seconds`, and frames are downscaled, measured and
+    labelled like sampled video frames. Only running sums, at most a block
+    plus one chunk (MAX_CHUNK_SECONDS) of pending audio and the last
+    `series_length` frame entries are kept, so memory does not grow with
+    session length. Invalid settings or chunks raise ValueError.
+    Nothing here touches a socket or device, so sessions can be driven
+    from recorded fixtures.
+    """
+
+    def __init__(self, analyzer: EmotionRecognition, sample_rate: int = 16000,
+                 audio_format: str = "pcm_s16le", block_seconds: float = 0.5,
+                 series_length: int = 120):
+        from ai.audio_features import HOP_LENGTH, TARGET_SR, AudioFeatureAccumulator
+
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unsupported audio format: {audio_format}")
+        if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"Sample rate must be between {MIN_SAMPLE_RATE} and {MAX_SAMPLE_RATE} Hz")
+        if not 0 < block_seconds <= MAX_BLOCK_SECONDS:
+            raise ValueError(f"Block length must be above 0 and at most {MAX_BLOCK_SECONDS} seconds")
+        self.analyzer = analyzer
+        self.sample_rate = sample_rate
+        self.audio_format = audio_format
+        self.audio = AudioFeatureAccumulator(sample_rate, max(int(block_seconds * TARGET_SR / HOP_LENGTH), 1))
+        self._partial_byte = b""
+        self._max_chunk_bytes = int(MAX_CHUNK_SECONDS * sample_rate) * AUDIO_FORMATS[audio_format].itemsize
+
+        self.frame_counts = np.zeros(3, dtype=np.int64)  # per FRAME_LABELS entry
+        self._first_seen = {}
+        self.frame_series = deque(maxlen=series_length)
+        self._lock = threading.Lock()
+
+    def add_audio(self, chunk: bytes):
+        """Fold a chunk of mono PCM in; complete blocks are analysed right away."""
+        if len(chunk) > self._max_chunk_bytes:
+            raise ValueError(f"Audio chunks may hold at most {MAX_CHUNK_SECONDS:g} seconds")
+        with self._lock:
+            data = self._partial_byte + chunk
+            dtype = AUDIO_FORMATS[self.audio_format]
+            usable = len(data) - len(data) % dtype.itemsize
+            self._partial_byte = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype=dtype).astype(np.float32)
+            if self.audio_format == "pcm_s16le":
+                samples /= 32768.0
+            self.audio.add_samples(samples)
+
+    def flush_audio(self):
+        """Analyse buffered samples that do not fill a whole block yet."""
+        with self._lock:
+            self.audio.finish()
+
+    def add_frame(self, jpeg: bytes, timestamp: Optional[float] = None):
+        """Decode one JPEG frame and fold its brightness label in."""
+        import cv2
+        from ai.video_features import FRAME_LABELS, downscale_gray, frame_statistics, label_frames
+
+        encoded = np.frombuffer(jpeg, dtype=np.uint8)
+        # Let the JPEG decoder skip detail we would throw away anyway
+        frame = cv2.imdecode(encoded, cv2.IMREAD_REDUCED_COLOR_2)
+        if frame is None:
+            raise ValueError("Could not decode video frame")
+        gray = downscale_gray(frame, self.analyzer.video_sample_width)
+        brightness = frame_statistics(gray[np.newaxis])["brightness"]
+        label = int(label_frames(brightness)[0])
+
+        with self._lock:
+            self._first_seen.setdefault(label, int(self.frame_counts.sum()))
+            self.frame_counts[label] += 1
+            self.frame_series.append({
+                "time": timestamp,
+                "brightness": round(float(brightness[0]), 4),
+                "emotion": FRAME_LABELS[label]
+            })
+
+    def audio_result(self) -> Optional[Dict]:
+        """Current audio estimate, shaped like analyze_audio's result."""
+        with self._lock:
+            if self.audio.frames == 0:
+                return None
+            features = self.audio.summary()
+        emotion, confidence = self.analyzer.classify_audio_features(features)
+        return {
+            "emotion": emotion,
+            "confidence": confidence,
+            "probabilities": label_distribution(emotion, confidence),
+            "features": {key: float(value) for key, value in features.items()}
+        }
+
+    def video_result(self) -> Optional[Dict]:
+        """Current video estimate, shaped like analyze_video's result."""
+        from ai.video_features import FRAME_LABELS
+
+        with self._lock:
+            total = int(self.frame_counts.sum())
+            if total == 0:
+                return None
+            # Most common label; ties go to the label seen first, as in summarize_labels
+            best = max(range(len(FRAME_LABELS)),
+                       key=lambda label: (self.frame_counts[label], -self._first_seen.get(label, total)))
+            series = list(self.frame_series)
+            return {
+                "emotion": FRAME_LABELS[best],
+                "confidence": float(self.frame_counts[best] / total),
+                "probabilities": {label: float(count / total)
+                                  for label, count in zip(FRAME_LABELS, self.frame_counts)},
+                "video_info": {"frames_analyzed": total},
+                "frame_series": {
+                    "time": [entry["time"] for entry in series],
+                    "brightness": [entry["brightness"] for entry in series],
+                    "emotion": [entry["emotion"] for entry in series]
+                }
+            }
+
+    def estimate(self) -> Dict:
+        """Per-modality estimates so far, for progress updates."""
+        return {"audio_analysis": self.audio_result(), "video_analysis": self.video_result()}
+
+    def fuse(self, text: str) -> Dict:
+        """Text analysis fused with the live estimates, as analyze_multimodal returns it."""
+        self.flush_audio()
+        result = self.analyzer.analyze_text(text)
+        return self.analyzer.combine_multimodal(result, self.audio_result(), self.video_result())
@@ -0,0 +1,191 @@
+from typing import Dict, Iterator, Optional
+import hashlib
+import os
+import random
+import threading
+import time
+
+
+class LLMBackend:
+    """Blocking text-generation backend used by Chatbot.
+
+    Calls are always made from the Chatbot's LLM executor, never on the
+    event loop, so implementations can block freely.
+    """
+
+    name = "base"
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the reply in chunks; defaults to one chunk from generate()."""
+        yield self.generate(prompt)
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = 'gemini-2.0-flash'):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        response = self.model.generate_content(prompt)
+        return response.text.strip()
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+class FakeBackend(LLMBackend):
+    """Local stand-in for tests and load runs; no network, no API key.
+
+    Replies are deterministic for a given prompt. `latency` seconds are
+    spent per call (spread across chunks when streaming) and a
+    `failure_rate` share of calls raise, to exercise the fallback paths.
+    """
+
+    name = "fake"
+
+    replies = [
+        "Thank you for sharing that with me. How long have you been feeling this way?",
+        "That sounds like a lot to carry. What would feel most helpful right now?",
+        "I'm glad you told me. Would you like to try a short breathing exercise together?",
+        "It makes sense to feel that way. Who could you reach out to for support today?"
+    ]
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+
+    def _reply_for(self, prompt: str) -> str:
+        self.calls += 1
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError("Fake backend failure")
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return self.replies[digest[0] % len(self.replies)]
+
+    def generate(self, prompt: str) -> str:
+        reply = self._reply_for(prompt)
+        time.sleep(self.latency)
+        return reply
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        words = self._reply_for(prompt).split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.latency / len(words))
+            yield word if i == 0 else f" {word}"
+
+
+def create_backend(name: Optional[str] = None) -> Optional[LLMBackend]:
+    """Create the configured backend, or None to use fallback responses only."""
+    name = (name or os.getenv("LLM_BACKEND", "gemini")).lower()
+
+    if name == "fake":
+        print("Using fake LLM backend")
+        return FakeBackend(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+            failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+        )
+
+    if name == "gemini":
+        try:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                print("Gemini API key not found, using fallback responses")
+                return None
+            backend = GeminiBackend(api_key)
+            print("Gemini AI integration enabled")
+            return backend
+        except ImportError:
+            print("Google Generative AI not available, using fallback responses")
+        except Exception as e:
+            print(
+                f"Gemini initialization failed: {e}, using fallback responses")
+        return None
+
+    if name != "none":
+        print(f"Unknown LLM backend '{name}', using fallback responses")
+    return None
+
+
+class CircuitBreaker:
+    """Stops calling the LLM provider after repeated errors or slow calls.
+
+    After `failure_threshold` consecutive failures (a call slower than
+    `slow_call_threshold` seconds counts as one) the breaker opens and
+    rejects calls for `reset_timeout` seconds. It then lets a single probe
+    call through (half-open); success closes it again, failure reopens it.
+    A caller that gives up on a call (client gone, task cancelled) must call
+    release_probe, or the half-open breaker would wait for a verdict forever.
+    """
+
+    def __init__(self, failure_threshold: int = 5, slow_call_threshold: Optional[float] = None,
+                 reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.metrics = {"opened": 0, "rejected": 0, "failures": 0, "slow_calls": 0}
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.metrics["rejected"] += 1
+                    return False
+                self.state = "half_open"
+                self._probe_in_flight = False
+
+            if self.state == "half_open":
+                if self._probe_in_flight:
+                    self.metrics["rejected"] += 1
+                    return False
+                self._probe_in_flight = True
+
+            return True
+
+    def record_success(self, duration: float):
+        if self.slow_call_threshold is not None and duration > self.slow_call_threshold:
+            self.metrics["slow_calls"] += 1
+            self.record_failure()
+            return
+
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Forget an abandoned half-open probe; the next call probes instead."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.metrics["failures"] += 1
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.metrics["opened"] += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "slow_call_threshold": self.slow_call_threshold,
+            "reset_timeout": self.reset_timeout,
+            **self.metrics
+        }
@@ -0,0 +1,100 @@
+from collections import deque
+from typing import Dict, List, Optional
+
+EMOTION_MARKER = "Current user emotion analysis:"
+
+
+class PromptBuilder:
+    """Assembles Gemini prompts from a pre-rendered template and per-user buffers.
+
+    The static parts of the system prompt are rendered once. Each user keeps
+    a buffer of already-rendered recent turns plus its joined text, updated
+    only when a turn is added. The buffer is held to `max_turns` turns and
+    `context_budget` characters (roughly 4 characters per token) by dropping
+    the oldest turns, and single messages are capped at `max_message_chars`,
+    so prompt size stays flat however long the conversation runs. Dropped
+    turns can be folded into a running summary that is sent in their place.
+    """
+
+    def __init__(self, system_prompt: str, max_turns: int = 5,
+                 context_budget: int = 2000, max_message_chars: int = 1000):
+        self.max_turns = max_turns
+        self.context_budget = context_budget
+        self.max_message_chars = max_message_chars
+
+        # Split the template around its per-request placeholders once
+        head, tail = system_prompt.split("{conversation_context}")
+        static_head, emotion_line = head.split(EMOTION_MARKER)
+        self._prefix = static_head
+        self._emotion_line = EMOTION_MARKER + emotion_line
+        self._suffix = tail
+
+        self._buffers: Dict[str, Dict] = {}  # user_id -> {"turns", "chars", "context", "summary"}
+
+    def _truncate(self, text: str, limit: int) -> str:
+        if limit > 0 and len(text) > limit:
+            return text[:max(limit - 3, 0)] + "..."
+        return text
+
+    def _buffer(self, user_id: str) -> Dict:
+        return self._buffers.setdefault(user_id, {"turns": deque(), "chars": 0, "context": "", "summary": ""})
+
+    def add_turn(self, user_id: str, user_message: str, bot_response: str) -> List[str]:
+        """Render one turn into the user's buffer and enforce the budget.
+
+        Returns the rendered turns dropped from the buffer, oldest first.
+        """
+        buffer = self._buffer(user_id)
+        turn = (f"User: {self._truncate(user_message, self.max_message_chars)}\n"
+                f"Assistant: {self._truncate(bot_response, self.max_message_chars)}")
+        buffer["turns"].append(turn)
+        buffer["chars"] += len(turn) + 1
+
+        # Drop the oldest turns first; keep at least the newest one
+        turns = buffer["turns"]
+        dropped = []
+        while len(turns) > 1 and (len(turns) > self.max_turns or buffer["chars"] > self.context_budget):
+            dropped.append(turns.popleft())
+            buffer["chars"] -= len(dropped[-1]) + 1
+
+        # A single turn over budget is truncated instead
+        if self.context_budget > 0 and buffer["chars"] > self.context_budget:
+            turns[0] = self._truncate(turns[0], self.context_budget - 1)
+            buffer["chars"] = len(turns[0]) + 1
+
+        buffer["context"] = "\n".join(turns)
+        return dropped
+
+    def get_context(self, user_id: str) -> str:
+        """Recent turns as "User:/Assistant:" lines, already joined."""
+        buffer = self._buffers.get(user_id)
+        return buffer["context"] if buffer else ""
+
+    def get_summary(self, user_id: str) -> str:
+        buffer = self._buffers.get(user_id)
+        return buffer["summary"] if buffer else ""
+
+    def set_summary(self, user_id: str, summary: str):
+        """Replace the running summary of turns older than the buffer."""
+        self._buffer(user_id)["summary"] = summary
+
+    def reset(self, user_id: Optional[str] = None):
+        if user_id is None:
+            self._buffers.clear()
+        else:
+            self._buffers.pop(user_id, None)
+
+    def build(self, user_id: str, message: str, emotion_label: str, emotion_confidence: float) -> str:
+        """Assemble the full prompt for the current message."""
+        conversation_context = self.get_context(user_id)
+        context_block = (f"Recent conversation:\n{conversation_context}" if conversation_context
+                         else "This is the start of the conversation.")
+        summary = self.get_summary(user_id)
+        if summary:
+            context_block = f"Summary of earlier conversation:\n{summary}\n\n{context_block}"
+        emotion_line = self._emotion_line.format(
+            emotion_label=emotion_label,
+            emotion_confidence=f"{emotion_confidence:.2f}"
+        )
+        message = self._truncate(message, self.max_message_chars)
+        return f"{self._prefix}{emotion_line}{context_block}{self._suffix}\n\nUser: {message}\n\nAssistant:"
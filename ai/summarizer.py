@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import asyncio
+import time
+
+from ai.llm_backend import CircuitBreaker, LLMBackend
+from ai.prompt_builder import PromptBuilder
+
+SUMMARY_PROMPT = """Summarize the conversation below between a young person and Aura, a supportive mental health companion, in at most {max_chars} characters. Keep the user's main concerns, feelings, coping strategies already discussed and anything they asked to be remembered. Write in the third person.
+
+{previous_summary}
+
+Conversation:
+{turns}
+
+Summary:"""
+
+
+class ConversationSummarizer:
+    """Folds turns dropped from the prompt buffer into a running summary.
+
+    Compaction runs as a background task on its own single-thread executor,
+    so it never adds latency to the request path or takes LLM slots away
+    from user requests. LLM calls share the chat path's circuit breaker and
+    get `timeout` seconds each. When no backend is configured, the breaker
+    rejects the call or the call fails or times out, a cheap extractive
+    summary is used instead.
+    """
+
+    def __init__(self, prompt_builder: PromptBuilder, backend: Optional[LLMBackend] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 batch_turns: int = 5, max_chars: int = 600, timeout: Optional[float] = 10.0):
+        self.prompt_builder = prompt_builder
+        self.backend = backend
+        self.circuit_breaker = circuit_breaker
+        self.batch_turns = batch_turns
+        self.max_chars = max_chars
+        self.timeout = timeout or None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+        self._pending: Dict[str, List[str]] = {}  # user_id -> rendered turns awaiting compaction
+        self._running: Dict[str, asyncio.Task] = {}
+        self.metrics = {"compactions": 0, "llm_summaries": 0, "extractive_summaries": 0,
+                        "errors": 0, "timeouts": 0}
+
+    def add_evicted(self, user_id: str, turns: List[str]):
+        """Queue turns dropped from the prompt buffer; cheap enough for the request path."""
+        if self.batch_turns <= 0 or not turns:
+            return
+
+        self._pending.setdefault(user_id, []).extend(turns)
+        self._schedule(user_id)
+
+    def _schedule(self, user_id: str):
+        if user_id in self._running or len(self._pending.get(user_id, [])) < self.batch_turns:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. synchronous scripts); compact on a later turn
+            return
+
+        task = loop.create_task(self.compact(user_id))
+        self._running[user_id] = task
+        task.add_done_callback(lambda _: self._on_done(user_id))
+
+    def _on_done(self, user_id: str):
+        self._running.pop(user_id, None)
+        # More turns may have been dropped while this compaction ran
+        self._schedule(user_id)
+
+    async def compact(self, user_id: str):
+        """Merge the pending turns for a user into their running summary."""
+        turns = self._pending.pop(user_id, [])
+        if not turns:
+            return
+
+        previous = self.prompt_builder.get_summary(user_id)
+        summary = None
+        if self.backend is not None and (self.circuit_breaker is None or self.circuit_breaker.allow()):
+            loop = asyncio.get_running_loop()
+            prompt = SUMMARY_PROMPT.format(
+                max_chars=self.max_chars,
+                previous_summary=f"Summary so far:\n{previous}" if previous else "There is no earlier summary.",
+                turns="\n".join(turns)
+            )
+            started = time.monotonic()
+            try:
+                # A call past the deadline keeps the executor thread, but not this task
+                response = await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, self.backend.generate, prompt), self.timeout)
+                self._record(success=True, duration=time.monotonic() - started)
+                summary = response.strip()
+                self.metrics["llm_summaries"] += 1
+            except asyncio.TimeoutError:
+                self._record(success=False)
+                self.metrics["timeouts"] += 1
+                print(f"Conversation summary exceeded {self.timeout}s deadline, using extractive summary")
+            except Exception as e:
+                self._record(success=False)
+                self.metrics["errors"] += 1
+                print(f"Conversation summary failed: {e}, using extractive summary")
+            except BaseException:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.release_probe()
+                raise
+
+        if not summary:
+            summary = self._extractive_summary(previous, turns)
+            self.metrics["extractive_summaries"] += 1
+
+        self.prompt_builder.set_summary(user_id, self._clip(summary))
+        self.metrics["compactions"] += 1
+
+    def _record(self, success: bool, duration: float = 0.0):
+        if self.circuit_breaker is None:
+            return
+        if success:
+            self.circuit_breaker.record_success(duration)
+        else:
+            self.circuit_breaker.record_failure()
+
+    def _extractive_summary(self, previous: str, turns: List[str]) -> str:
+        """Keep the gist of what the user said, newest last."""
+        said = []
+        for turn in turns:
+            user_line = turn.split("\nAssistant: ", 1)[0]
+            if user_line.startswith("User: "):
+                user_line = user_line[len("User: "):]
+            said.append(user_line[:80])
+        summary = f"Earlier the user said: {'; '.join(said)}"
+        return f"{previous} {summary}" if previous else summary
+
+    def _clip(self, summary: str) -> str:
+        # Keep the most recent part of an over-long summary
+        if len(summary) > self.max_chars:
+            return "..." + summary[-(self.max_chars - 3):]
+        return summary
+
+    def stats(self) -> Dict:
+        return {
+            "batch_turns": self.batch_turns,
+            "max_chars": self.max_chars,
+            "timeout": self.timeout,
+            "pending_users": len(self._pending),
+            "running": len(self._running),
+            **self.metrics
+        }
@@ -0,0 +1,378 @@
+from typing import Dict, Optional, Tuple, Union
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# Bytes read from the request and written to disk per step
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Leftover files in tmp/ older than this (seconds) are from failed uploads
+TEMP_FILE_MAX_AGE = 3600
+
+# Per-user files from before the blob store, cleaned up by age only
+LEGACY_UPLOAD_DIRS = ("audio", "video")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _write_chunk(out, digest, chunk: bytes):
+    digest.update(chunk)
+    out.write(chunk)
+
+
+async def stream_upload(file, destination: str, max_bytes: int = 0,
+                        chunk_size: int = UPLOAD_CHUNK_SIZE) -> Dict:
+    """Copy an UploadFile to `destination` in chunks, hashing it on the way.
+
+    Reads are awaited and each write/hash step runs in a worker thread, so a
+    large upload never blocks the event loop. The file is written next to
+    `destination` under a temporary name and renamed into place only once
+    complete; if it grows past `max_bytes` (0 = no limit) the partial file
+    is removed and UploadTooLarge is raised. Returns the size and SHA-256
+    of the contents, matching cache.file_digest.
+    """
+    if max_bytes > 0 and file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(f"File exceeds the {max_bytes} byte limit")
+
+    digest = hashlib.sha256()
+    size = 0
+    partial_path = f"{destination}.part"
+    try:
+        with open(partial_path, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes > 0 and size > max_bytes:
+                    raise UploadTooLarge(f"File exceeds the {max_bytes} byte limit")
+                await asyncio.to_thread(_write_chunk, out, digest, chunk)
+        os.replace(partial_path, destination)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return {"size": size, "sha256": digest.hexdigest()}
+
+
+async def read_upload(file, max_bytes: int = 0, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[bytes, str]:
+    """Read an UploadFile into memory in chunks; returns the bytes and their SHA-256.
+
+    For payloads small enough to analyse before they are stored. The
+    parser may already have spooled the part to a temporary file (Starlette
+    does so above 1 MB); reading it here takes the store write off the
+    analysis path. The `max_bytes` limit is enforced as in stream_upload.
+    """
+    if max_bytes > 0 and file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(f"File exceeds the {max_bytes} byte limit")
+
+    digest = hashlib.sha256()
+    data = bytearray()
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        if max_bytes > 0 and len(data) + len(chunk) > max_bytes:
+            raise UploadTooLarge(f"File exceeds the {max_bytes} byte limit")
+        digest.update(chunk)
+        data += chunk
+    return bytes(data), digest.hexdigest()
+
+
+class UploadStore:
+    """Content-addressed store for uploaded media.
+
+    Each file is stored once under `root/blobs/`, named by the SHA-256 of
+    its contents (the blob id), however many users upload it. A SQLite
+    index maps every user's uploads to blobs, so a blob id only resolves
+    for users who uploaded that content themselves. Uploads land in
+    `root/tmp/` first and are moved into place once hashed.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.getenv("UPLOAD_DIR", "uploads")
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "blob_id TEXT PRIMARY KEY, kind TEXT NOT NULL, ext TEXT NOT NULL, "
+                "size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS refs ("
+                "owner TEXT NOT NULL, blob_id TEXT NOT NULL, filename TEXT NOT NULL, "
+                "created_at REAL NOT NULL, PRIMARY KEY (owner, blob_id, filename))"
+            )
+        self.metrics = {"uploads": 0, "deduplicated": 0}
+
+    def temp_path(self) -> str:
+        """Fresh path under tmp/ to stream an upload into."""
+        return os.path.join(self.tmp_dir, uuid.uuid4().hex)
+
+    def blob_path(self, blob_id: str, ext: str = "") -> str:
+        # Fan out by hash prefix so no single directory gets huge
+        return os.path.join(self.blob_dir, blob_id[:2], blob_id + ext)
+
+    def add(self, source: Union[str, bytes], digest: str, size: int, kind: str, filename: str, owner: str) -> Dict:
+        """Move a hashed upload into the store and record it for `owner`.
+
+        `source` is a temporary file from temp_path() or the content itself.
+        If the content is already stored, the temporary file is dropped and
+        nothing is written. Content is written to tmp/ before the store lock
+        is taken; the lock only covers the index update and the final rename.
+        """
+        now = time.time()
+        ext = os.path.splitext(filename)[1].lower()
+        if isinstance(source, bytes) and self._stored_ext(digest) is None:
+            source = self._write_temp(source)
+        with self._lock:
+            row = self._conn.execute("SELECT ext FROM blobs WHERE blob_id = ?", (digest,)).fetchone()
+            deduplicated = row is not None and os.path.exists(self.blob_path(digest, row[0]))
+            if deduplicated:
+                ext = row[0]
+                if isinstance(source, str):
+                    os.remove(source)
+            else:
+                if isinstance(source, bytes):
+                    # Collected since the check above; rare enough to write here
+                    source = self._write_temp(source)
+                path = self.blob_path(digest, ext)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(source, path)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs (blob_id, kind, ext, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, COALESCE((SELECT created_at FROM blobs WHERE blob_id = ?), ?), ?)",
+                    (digest, kind, ext, size, digest, now, now))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO refs (owner, blob_id, filename, created_at) VALUES (?, ?, ?, ?)",
+                    (owner, digest, filename, now))
+            self.metrics["uploads"] += 1
+            self.metrics["deduplicated"] += deduplicated
+        return {
+            "blob_id": digest,
+            "path": self.blob_path(digest, ext),
+            "size": size,
+            "deduplicated": deduplicated
+        }
+
+    def _stored_ext(self, blob_id: str) -> Optional[str]:
+        """Extension of a blob whose file is present, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT ext FROM blobs WHERE blob_id = ?", (blob_id,)).fetchone()
+        if row is None or not os.path.exists(self.blob_path(blob_id, row[0])):
+            return None
+        return row[0]
+
+    def _write_temp(self, data: bytes) -> str:
+        temp_path = self.temp_path()
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        return temp_path
+
+    def resolve(self, blob_id: str, owner: str) -> Optional[str]:
+        """Path of a blob `owner` has uploaded, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.ext FROM blobs b JOIN refs r ON r.blob_id = b.blob_id "
+                "WHERE b.blob_id = ? AND r.owner = ? LIMIT 1", (blob_id, owner)).fetchone()
+            if row is None:
+                return None
+            path = self.blob_path(blob_id, row[0])
+            if not os.path.exists(path):
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE blobs SET accessed_at = ? WHERE blob_id = ?", (time.time(), blob_id))
+        return path
+
+    def user_usage(self, owner: str) -> Dict:
+        """Bytes and blobs charged to `owner`; shared blobs count in full for each user."""
+        with self._lock:
+            blobs, used = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs WHERE blob_id IN "
+                "(SELECT blob_id FROM refs WHERE owner = ?)", (owner,)).fetchone()
+        return {"blobs": blobs, "bytes": used}
+
+    def collect_garbage(self, retention: float = 0, max_bytes: int = 0, max_user_bytes: int = 0,
+                        now: Optional[float] = None) -> Dict:
+        """Delete blobs by age and quota, least recently used first.
+
+        In order: blobs unused for `retention` seconds are removed; users
+        over `max_user_bytes` lose their least recently used uploads until
+        they fit (a blob shared with other users stays for them); then
+        blobs are removed until the store fits `max_bytes`. Blobs no user
+        refers to any more are always removed. A limit of 0 disables that
+        step. Stale temporary files and expired legacy uploads are cleaned
+        up as well.
+        """
+        now = time.time() if now is None else now
+        deleted_blobs = 0
+        freed_bytes = 0
+        dropped_refs = 0
+        with self._lock:
+            with self._conn:
+                if retention > 0:
+                    self._conn.execute(
+                        "DELETE FROM refs WHERE blob_id IN (SELECT blob_id FROM blobs WHERE accessed_at < ?)",
+                        (now - retention,))
+
+                if max_user_bytes > 0:
+                    over_quota = self._conn.execute(
+                        "SELECT owner, SUM(size) FROM "
+                        "(SELECT DISTINCT r.owner, b.blob_id, b.size FROM refs r JOIN blobs b ON b.blob_id = r.blob_id) "
+                        "GROUP BY owner HAVING SUM(size) > ?", (max_user_bytes,)).fetchall()
+                    for owner, used in over_quota:
+                        rows = self._conn.execute(
+                            "SELECT blob_id, size FROM blobs WHERE blob_id IN "
+                            "(SELECT blob_id FROM refs WHERE owner = ?) ORDER BY accessed_at", (owner,)).fetchall()
+                        for blob_id, size in rows:
+                            if used <= max_user_bytes:
+                                break
+                            dropped_refs += self._conn.execute(
+                                "DELETE FROM refs WHERE owner = ? AND blob_id = ?", (owner, blob_id)).rowcount
+                            used -= size
+
+                # Blobs nobody refers to any more
+                doomed = self._conn.execute(
+                    "SELECT blob_id, ext, size FROM blobs WHERE blob_id NOT IN (SELECT blob_id FROM refs)").fetchall()
+                if max_bytes > 0:
+                    total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+                    total -= sum(size for _, _, size in doomed)
+                    doomed_ids = {blob_id for blob_id, _, _ in doomed}
+                    for row in self._conn.execute(
+                            "SELECT blob_id, ext, size FROM blobs ORDER BY accessed_at").fetchall():
+                        if total <= max_bytes:
+                            break
+                        if row[0] not in doomed_ids:
+                            doomed.append(row)
+                            total -= row[2]
+
+                for blob_id, ext, size in doomed:
+                    self._conn.execute("DELETE FROM refs WHERE blob_id = ?", (blob_id,))
+                    self._conn.execute("DELETE FROM blobs WHERE blob_id = ?", (blob_id,))
+                    try:
+                        os.remove(self.blob_path(blob_id, ext))
+                    except FileNotFoundError:
+                        pass
+                    deleted_blobs += 1
+                    freed_bytes += size
+
+        stale = [(self.tmp_dir, TEMP_FILE_MAX_AGE)]
+        if retention > 0:
+            stale += [(os.path.join(self.root, name), retention) for name in LEGACY_UPLOAD_DIRS]
+        deleted_files = 0
+        for directory, max_age in stale:
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                try:
+                    if entry.is_file() and now - entry.stat().st_mtime > max_age:
+                        freed_bytes += entry.stat().st_size
+                        os.remove(entry.path)
+                        deleted_files += 1
+                except FileNotFoundError:
+                    pass
+
+        return {
+            "deleted_blobs": deleted_blobs,
+            "dropped_refs": dropped_refs,
+            "deleted_files": deleted_files,
+            "freed_bytes": freed_bytes
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            blobs, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            refs, users = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT owner) FROM refs").fetchone()
+        return {"blobs": blobs, "bytes": stored_bytes, "refs": refs, "users": users, "root": self.root, **self.metrics}
+
+
+class UploadJanitor:
+    """Background retention and quota enforcement for an UploadStore.
+
+    Started from the app's lifespan, it runs UploadStore.collect_garbage
+    every `interval` seconds on a worker thread. Limits come from the
+    UPLOAD_RETENTION, UPLOAD_MAX_TOTAL_BYTES and UPLOAD_MAX_USER_BYTES
+    environment variables unless given; 0 disables a limit.
+    """
+
+    def __init__(self, store: UploadStore, interval: Optional[float] = None, retention: Optional[float] = None,
+                 max_bytes: Optional[int] = None, max_user_bytes: Optional[int] = None):
+        if interval is None:
+            interval = float(os.getenv("UPLOAD_GC_INTERVAL", "300"))
+        if retention is None:
+            retention = float(os.getenv("UPLOAD_RETENTION", str(7 * 24 * 3600)))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("UPLOAD_MAX_TOTAL_BYTES", str(5 * 1024 ** 3)))
+        if max_user_bytes is None:
+            max_user_bytes = int(os.getenv("UPLOAD_MAX_USER_BYTES", str(500 * 1024 ** 2)))
+
+        self.store = store
+        self.interval = interval
+        self.retention = retention
+        self.max_bytes = max_bytes
+        self.max_user_bytes = max_user_bytes
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[float] = None
+        self.metrics = {"runs": 0, "deleted_blobs": 0, "dropped_refs": 0, "deleted_files": 0,
+                        "freed_bytes": 0, "errors": 0}
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await self.collect()
+            await asyncio.sleep(self.interval)
+
+    async def collect(self) -> Dict:
+        """One collection pass, off the event loop."""
+        try:
+            result = await asyncio.to_thread(
+                self.store.collect_garbage, self.retention, self.max_bytes, self.max_user_bytes
+            )
+        except Exception as e:
+            print(f"Error collecting uploads: {e}")
+            self.metrics["errors"] += 1
+            return {}
+        self.metrics["runs"] += 1
+        for key, value in result.items():
+            self.metrics[key] += value
+        self.last_run = time.time()
+        if result["deleted_blobs"] or result["deleted_files"]:
+            print(f"Upload janitor freed {result['freed_bytes']} bytes")
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None,
+            "interval": self.interval,
+            "retention": self.retention,
+            "max_bytes": self.max_bytes,
+            "max_user_bytes": self.max_user_bytes,
+            "last_run": self.last_run,
+            **self.metrics
+        }
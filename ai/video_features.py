@@ -0,0 +1,170 @@
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple, Union
+import math
+
+# Imported lazily from analyze_video, like audio_features
+import cv2
+import numpy as np
+
+# Frames are shrunk to at most this width before any per-pixel work
+SAMPLE_WIDTH = 160
+
+# Brightness cut-offs of the placeholder emotion inference, and its labels
+BRIGHT_THRESHOLD = 0.6
+DARK_THRESHOLD = 0.4
+FRAME_LABELS = ("neutral", "happy", "sad")
+
+
+def sampling_interval(fps: float, frame_count: int, max_frames: int) -> int:
+    """Frames between samples: one per second, widened to spread `max_frames` over the clip."""
+    interval = int(fps) if fps > 0 else 30
+    if max_frames > 0 and frame_count > 0:
+        interval = max(interval, math.ceil(frame_count / max_frames))
+    return max(interval, 1)
+
+
+def _sample_shape(width: int, height: int, max_width: int) -> Tuple[int, int]:
+    if max_width > 0 and width > max_width:
+        return max(int(height * max_width / width), 1), max_width
+    return height, width
+
+
+def downscale_gray(frame: np.ndarray, max_width: int = SAMPLE_WIDTH) -> np.ndarray:
+    """Shrink a BGR frame to at most `max_width` wide, then convert to grayscale."""
+    height, width = frame.shape[:2]
+    sample_height, sample_width = _sample_shape(width, height, max_width)
+    if (sample_height, sample_width) != (height, width):
+        frame = cv2.resize(frame, (sample_width, sample_height), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def keyframe_indices(source: Union[str, BinaryIO]) -> Optional[np.ndarray]:
+    """Frame indices of a clip's keyframes, or None if they cannot be listed.
+
+    One pass over the file in raw mode (CAP_PROP_FORMAT -1): packets are
+    demuxed and their key flag read, but nothing is decoded, so this costs
+    little more than reading the file. `source` is a path or a binary file
+    object that is not in use by another capture.
+    """
+    if isinstance(source, str):
+        cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG)
+    else:
+        cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG, [])
+    try:
+        if not cap.isOpened() or not cap.set(cv2.CAP_PROP_FORMAT, -1):
+            return None
+        keyframes = []
+        index = 0
+        while cap.grab():
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(index)
+            index += 1
+    finally:
+        cap.release()
+    return np.asarray(keyframes, dtype=np.int64) if keyframes else None
+
+
+def iter_sampled_frames(cap: "cv2.VideoCapture", interval: int, max_frames: int,
+                        max_width: int = SAMPLE_WIDTH,
+                        keyframes: Optional[np.ndarray] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (frame index, small grayscale frame) for every `interval`-th frame.
+
+    The clip is read forward: grab() advances without converting the
+    frame, and only sampled frames are retrieved. With `keyframes` (see
+    keyframe_indices), a sample whose nearest preceding keyframe lies
+    ahead of the read position is reached by seeking to that keyframe and
+    grabbing forward from it, so gaps spanning whole GOPs are skipped but
+    a seek never lands mid-GOP and throws decoded frames away. Retrieved
+    frames are downscaled before the grayscale conversion, and at most
+    `max_frames` are yielded (0 means no cap).
+
+    Accuracy: frame indices after a seek assume keyframe packets sit at
+    their presentation index, as with closed GOPs at a constant frame
+    rate, where samples are exactly those of a sequential read. With open
+    GOPs or a variable frame rate a sample may land a frame or so away.
+    Without `keyframes` the whole clip is read sequentially, which is
+    exact but decodes every frame.
+    """
+    position = 0  # index of the frame the next grab() returns
+    target = 0
+    sampled = 0
+    while max_frames <= 0 or sampled < max_frames:
+        if keyframes is not None:
+            nearest = np.searchsorted(keyframes, target, side="right") - 1
+            if nearest >= 0 and keyframes[nearest] > position:
+                position = int(keyframes[nearest])
+                cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+        while position < target:
+            if not cap.grab():
+                return
+            position += 1
+        if not cap.grab():
+            return
+        position += 1
+        ret, frame = cap.retrieve()
+        if ret:
+            sampled += 1
+            yield target, downscale_gray(frame, max_width)
+        target += interval
+
+
+def collect_sampled_frames(cap: "cv2.VideoCapture", interval: int, max_frames: int,
+                           max_width: int = SAMPLE_WIDTH,
+                           keyframes: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Gather sampled frames into one preallocated (n, height, width) uint8 buffer.
+
+    Returns the frame indices and the filled part of the buffer. The buffer
+    is sized from the clip's properties up front; frames whose size differs
+    from the container's are resized to fit.
+    """
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    capacity = max_frames if max_frames > 0 else max(frame_count // interval + 1, 1)
+    shape = _sample_shape(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                          max_width)
+    buffer = None
+    indices = []
+    for index, gray in iter_sampled_frames(cap, interval, max_frames, max_width, keyframes):
+        if buffer is None:
+            if min(shape) <= 0:
+                shape = gray.shape
+            buffer = np.empty((capacity,) + shape, dtype=np.uint8)
+        elif len(indices) == len(buffer):
+            # Frame count was underreported; grow instead of dropping samples
+            buffer = np.concatenate([buffer, np.empty_like(buffer)])
+        if gray.shape != shape:
+            gray = cv2.resize(gray, (shape[1], shape[0]), interpolation=cv2.INTER_AREA)
+        buffer[len(indices)] = gray
+        indices.append(index)
+
+    if buffer is None:
+        return np.empty(0, dtype=np.int64), np.empty((0,) + shape, dtype=np.uint8)
+    return np.asarray(indices, dtype=np.int64), buffer[:len(indices)]
+
+
+def frame_statistics(frames: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-frame features of a (n, height, width) uint8 stack in one vectorized pass."""
+    pixels = frames.reshape(len(frames), -1)
+    return {"brightness": pixels.mean(axis=1, dtype=np.float64) / 255.0}
+
+
+def label_frames(brightness: np.ndarray) -> np.ndarray:
+    """Index into FRAME_LABELS for each frame's brightness."""
+    return np.select([brightness > BRIGHT_THRESHOLD, brightness < DARK_THRESHOLD], [1, 2], default=0)
+
+
+def label_probabilities(labels: np.ndarray) -> Dict[str, float]:
+    """Share of frames carrying each of FRAME_LABELS."""
+    if not len(labels):
+        return {}
+    counts = np.bincount(labels, minlength=len(FRAME_LABELS))
+    return {label: float(count / len(labels)) for label, count in zip(FRAME_LABELS, counts)}
+
+
+def summarize_labels(labels: np.ndarray) -> Tuple[str, float]:
+    """Most common label and its share; ties go to the label seen first, as with Counter."""
+    if not len(labels):
+        return "neutral", 0.5
+    counts = np.bincount(labels, minlength=len(FRAME_LABELS))
+    tied = np.flatnonzero(counts == counts.max())
+    first_seen = [int(np.argmax(labels == label)) for label in tied]
+    winner = int(tied[int(np.argmin(first_seen))])
+    return FRAME_LABELS[winner], float(counts[winner] / len(labels))
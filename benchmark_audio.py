@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark the fast and accurate audio analysis tiers.
+
+Usage: python benchmark_audio.py [audio files...]
+Without arguments a synthetic set of voice-like clips is generated.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+from ai.emotion_recognition import EmotionRecognition
+
+CLIP_SECONDS = 30
+
+
+def synthesize_clips(directory):
+    """Write voice-like test clips covering each audio label."""
+    rng = np.random.default_rng(42)
+    clips = []
+    # (name, pitch Hz, amplitude, noise level, sample rate)
+    specs = [
+        ("excited_high_loud", 260, 0.35, 0.01, 22050),
+        ("excited_44k", 240, 0.30, 0.02, 44100),
+        ("sad_low_quiet", 110, 0.04, 0.002, 22050),
+        ("sad_16k", 125, 0.03, 0.001, 16000),
+        ("anxious_noisy", 180, 0.10, 0.25, 22050),
+        ("anxious_breathy_44k", 210, 0.08, 0.30, 44100),
+        ("neutral_mid", 170, 0.06, 0.005, 22050),
+        ("neutral_high_soft", 230, 0.05, 0.005, 16000),
+    ]
+    for name, pitch, amplitude, noise, sr in specs:
+        t = np.arange(CLIP_SECONDS * sr) / sr
+        # Slow vibrato and a few harmonics, gated into syllable-like bursts
+        phase = 2 * np.pi * np.cumsum(pitch * (1 + 0.03 * np.sin(2 * np.pi * 5 * t))) / sr
+        voice = sum(np.sin(k * phase) / k for k in range(1, 5))
+        envelope = (np.sin(2 * np.pi * 2 * t) > -0.6).astype(float)
+        y = amplitude * voice / 1.5 * envelope + noise * rng.standard_normal(len(t))
+        path = os.path.join(directory, f"{name}.wav")
+        sf.write(path, y.astype(np.float32), sr)
+        clips.append(path)
+    return clips
+
+
+def run_tier(quality, clips):
+    os.environ["AUDIO_QUALITY"] = quality
+    analyzer = EmotionRecognition(media_cache_backend="none")
+    # Warm up first so one-off JIT compilation is not timed
+    analyzer.analyze_audio(clips[0])
+    results = {}
+    for path in clips:
+        start = time.perf_counter()
+        result = analyzer.analyze_audio(path)
+        results[path] = (result, time.perf_counter() - start)
+    return results
+
+
+def benchmark_audio_tiers(clips):
+    print("🎧 AuraYouth Audio Tier Benchmark")
+    print("=" * 50)
+
+    accurate = run_tier("accurate", clips)
+    fast = run_tier("fast", clips)
+
+    matches = 0
+    accurate_total = fast_total = 0.0
+    for path in clips:
+        accurate_result, accurate_time = accurate[path]
+        fast_result, fast_time = fast[path]
+        accurate_total += accurate_time
+        fast_total += fast_time
+        same = accurate_result["emotion"] == fast_result["emotion"]
+        matches += same
+
+        print(f"\n{os.path.basename(path)}")
+        for tier, result, elapsed in (("accurate", accurate_result, accurate_time),
+                                      ("fast", fast_result, fast_time)):
+            features = result.get("features", {})
+            print(f"   {tier:<9} {result['emotion']:<8} {elapsed * 1000:8.1f} ms  "
+                  f"pitch={features.get('pitch_mean', 0):6.1f}  "
+                  f"energy={features.get('energy_mean', 0):.3f}  "
+                  f"zcr={features.get('zcr_mean', 0):.3f}")
+        print(f"   {'✅ labels match' if same else '⚠️  labels differ'}")
+
+    print("\n📊 Summary")
+    print(f"   Label agreement: {matches}/{len(clips)}")
+    print(f"   Accurate tier:   {accurate_total:.2f} s")
+    print(f"   Fast tier:       {fast_total:.2f} s")
+    if fast_total > 0:
+        print(f"   Speedup:         {accurate_total / fast_total:.1f}x")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        benchmark_audio_tiers(sys.argv[1:])
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            benchmark_audio_tiers(synthesize_clips(directory))
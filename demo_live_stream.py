@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Replay recorded audio/video through the live analysis WebSocket.
+
+Usage: python demo_live_stream.py [--audio clip.wav] [--video clip.mp4] [--realtime]
+No webcam or microphone is needed; the files stand in for the devices.
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+import soundfile as sf
+from websockets.sync.client import connect
+
+WS_BASE = "ws://localhost:8000"
+CHUNK_SECONDS = 0.1
+FRAMES_PER_SECOND = 5
+
+
+def media_messages(audio_path, video_path):
+    """Yield (timestamp, binary message) pairs in capture order."""
+    messages = []
+    if audio_path:
+        audio, sr = sf.read(audio_path, dtype="float32", always_2d=True)
+        pcm = (np.clip(audio.mean(axis=1), -1, 1) * 32767).astype("<i2")
+        step = int(sr * CHUNK_SECONDS)
+        for start in range(0, len(pcm), step):
+            messages.append((start / sr, b"A" + pcm[start:start + step].tobytes()))
+    else:
+        sr = 16000
+
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        interval = max(int(fps / FRAMES_PER_SECOND), 1)
+        index = 0
+        while cap.grab():
+            if index % interval == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                    if ok:
+                        messages.append((index / fps, b"V" + jpeg.tobytes()))
+            index += 1
+        cap.release()
+
+    messages.sort(key=lambda item: item[0])
+    return sr, messages
+
+
+def demo_live_stream(audio_path, video_path, message, realtime):
+    print("🎥 AuraYouth Live Analysis Demo")
+    print("=" * 50)
+
+    sr, messages = media_messages(audio_path, video_path)
+    print(f"1. Streaming {len(messages)} media chunks...")
+
+    with connect(f"{WS_BASE}/ws/live/demo_user") as websocket:
+        websocket.send(json.dumps({"type": "start", "sample_rate": sr, "audio_format": "pcm_s16le"}))
+        print(f"   {json.loads(websocket.recv())['type']}")
+
+        started = time.monotonic()
+        for timestamp, payload in messages:
+            if realtime:
+                time.sleep(max(timestamp - (time.monotonic() - started), 0))
+            websocket.send(payload)
+
+        # Drain running estimates until the reply to the text message arrives
+        print(f"\n2. Sending message: '{message}'")
+        websocket.send(json.dumps({"type": "message", "message": message}))
+        estimates = 0
+        while True:
+            data = json.loads(websocket.recv())
+            if data["type"] == "estimate":
+                estimates += 1
+            elif data["type"] == "error":
+                print(f"   ❌ {data['detail']}")
+            elif data["type"] == "bot":
+                break
+
+    print(f"   Running estimates received: {estimates}")
+    for modality in ("audio_analysis", "video_analysis"):
+        if data.get(modality):
+            print(f"   {modality}: {data[modality]['emotion']} ({data[modality]['confidence']:.2f})")
+    print(f"   Fused emotion: {data['emotion']} ({data['confidence']:.2f})")
+    if data.get("crisis_detected"):
+        print(f"   🚨 CRISIS DETECTED: {data['crisis_type']}")
+    print(f"   Reply: {data['content']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", help="recorded audio file (WAV, FLAC, OGG)")
+    parser.add_argument("--video", help="recorded video file")
+    parser.add_argument("--message", default="I'm feeling a bit overwhelmed today")
+    parser.add_argument("--realtime", action="store_true", help="pace chunks like a live capture")
+    args = parser.parse_args()
+    demo_live_stream(args.audio, args.video, args.message, args.realtime)
@@ -1,19 +1,22 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Union
 import uvicorn
 import json
 import asyncio
+from ai.analysis_pool import AnalysisPool
 from ai.chatbot import Chatbot
 from ai.emotion_recognition import EmotionRecognition
 from ai.digital_twin import DigitalTwin
+from ai.jobs import JobStore
+from ai.live_analysis import AUDIO_TAG, VIDEO_TAG, LiveSession
+from ai.uploads import UploadJanitor, UploadStore, UploadTooLarge, read_upload, stream_upload
 from database.connection import get_database, connect_to_database, close_database_connection
 from auth.security import authenticate_user, create_access_token, get_current_active_user, get_current_user, fake_users_db, Token
 import os
-import shutil
 from dotenv import load_dotenv
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
@@ -21,17 +24,59 @@ from datetime import timedelta
 
 load_dotenv()
 
-# Initialize AI components
-chatbot = Chatbot()
-emotion_recog = EmotionRecognition()
-digital_twin = DigitalTwin()
+# AI components are built by create_components() at startup, not on import:
+# spawned analysis workers re-import this module as __mp_main__
+chatbot: Optional[Chatbot] = None
+emotion_recog: Optional[EmotionRecognition] = None
+digital_twin: Optional[DigitalTwin] = None
+analysis_pool: Optional[AnalysisPool] = None
+job_store: Optional[JobStore] = None
+upload_store: Optional[UploadStore] = None
+upload_janitor: Optional[UploadJanitor] = None
+job_tasks = set()
+persist_tasks = set()
+
+# Most texts accepted by one /emotion/batch request
+EMOTION_BATCH_MAX_TEXTS = int(os.getenv("EMOTION_BATCH_MAX_TEXTS", "1000"))
+
+# Seconds between running-estimate frames on the live socket
+LIVE_UPDATE_INTERVAL = float(os.getenv("LIVE_UPDATE_INTERVAL", "0.5"))
+
+# Upload size limits in bytes (0 = unlimited)
+UPLOAD_MAX_AUDIO_BYTES = int(os.getenv("UPLOAD_MAX_AUDIO_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_MAX_VIDEO_BYTES = int(os.getenv("UPLOAD_MAX_VIDEO_BYTES", str(200 * 1024 * 1024)))
+# Uploads up to this size are read into memory and analysed by /chat/multimodal/upload
+# before they reach the upload store
+UPLOAD_MEMORY_LIMIT = int(os.getenv("UPLOAD_MEMORY_LIMIT", str(8 * 1024 * 1024)))
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.m4a', '.flac')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+def create_components():
+    """Initialize AI components and stores shared by the endpoints."""
+    global chatbot, emotion_recog, digital_twin, analysis_pool, job_store, upload_store, upload_janitor
+    chatbot = Chatbot()
+    emotion_recog = EmotionRecognition()
+    digital_twin = DigitalTwin()
+    analysis_pool = AnalysisPool()
+    job_store = JobStore()
+    upload_store = UploadStore()
+    upload_janitor = UploadJanitor(upload_store)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    create_components()
     await connect_to_database()
+    analysis_pool.start()
+    upload_janitor.start()
     yield
     # Shutdown
+    await upload_janitor.stop()
+    # Let in-memory uploads finish writing to the blob store
+    if persist_tasks:
+        await asyncio.gather(*persist_tasks, return_exceptions=True)
+    analysis_pool.shutdown()
     await close_database_connection()
 
 app = FastAPI(title="AuraYouth API", version="1.0.0", lifespan=lifespan)
@@ -63,6 +108,8 @@ class MultimodalChatRequest(BaseModel):
     context: Optional[dict] = None
     audio_file: Optional[str] = None  # Path to uploaded audio file
     video_file: Optional[str] = None  # Path to uploaded video file
+    audio_blob_id: Optional[str] = None  # blob_id returned by /upload/audio
+    video_blob_id: Optional[str] = None  # blob_id returned by /upload/video
 
 class ChatResponse(BaseModel):
     response: str
@@ -71,6 +118,13 @@ class ChatResponse(BaseModel):
     crisis_detected: Optional[bool] = False
     crisis_type: Optional[str] = None
 
+class MultimodalUploadResponse(ChatResponse):
+    audio_blob_id: Optional[str] = None
+    video_blob_id: Optional[str] = None
+
+class EmotionBatchRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=EMOTION_BATCH_MAX_TEXTS)
+
 class UserProfile(BaseModel):
     user_id: str
     age: int
@@ -159,6 +213,23 @@ async def chat_endpoint(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/emotion/batch")
+async def emotion_batch_endpoint(
+    request: EmotionBatchRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Protected endpoint that scores many texts in one request, off the event loop."""
+    try:
+        # Verify token
+        token = credentials.credentials
+        current_user = await get_current_active_user(await get_current_user(token))
+        
+        # One keyword scan per text; a large batch must not stall other requests
+        results = await asyncio.to_thread(emotion_recog.analyze_texts, request.texts)
+        return {"results": results, "count": len(results)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
@@ -198,19 +269,38 @@ async def websocket_chat_endpoint(websocket: WebSocket, user_id: str):
             # Analyze emotion
             emotion = emotion_recog.analyze_text(message_data["message"])
             
-            # Get AI response
-            crisis_type = chatbot._detect_crisis(message_data["message"])
+            # Get AI response (crisis scan is shared with the emotion analysis)
+            crisis_type = emotion.get("crisis_type")
             crisis_detected = crisis_type is not None
-            response = await chatbot.generate_response(
-                message_data["message"],
-                user_id,
-                emotion,
-                message_data.get("context", [])
-            )
+            import time
+            if message_data.get("stream"):
+                # Push partial "delta" frames as the reply is generated,
+                # then the final frame below with the emotion/crisis metadata
+                bot_message_id = f"{int(time.time() * 1000)}-{hash(message_data['message']) % 10000}"
+                parts = []
+                async for delta in chatbot.stream_response(
+                    message_data["message"],
+                    user_id,
+                    emotion,
+                    message_data.get("context", [])
+                ):
+                    parts.append(delta)
+                    await manager.send_personal_message(json.dumps({
+                        "id": bot_message_id,
+                        "type": "delta",
+                        "content": delta
+                    }), user_id)
+                response = "".join(parts)
+            else:
+                response = await chatbot.generate_response(
+                    message_data["message"],
+                    user_id,
+                    emotion,
+                    message_data.get("context", [])
+                )
+                bot_message_id = f"{int(time.time() * 1000)}-{hash(response) % 10000}"
             
             # Prepare response
-            import time
-            bot_message_id = f"{int(time.time() * 1000)}-{hash(response) % 10000}"
             response_data = {
                 "id": bot_message_id,
                 "type": "bot",
@@ -233,6 +323,103 @@ async def websocket_chat_endpoint(websocket: WebSocket, user_id: str):
         print(f"WebSocket error: {e}")
         manager.disconnect(websocket, user_id)
 
+@app.websocket("/ws/live/{user_id}")
+async def websocket_live_endpoint(websocket: WebSocket, user_id: str):
+    """WebSocket endpoint for live webcam/mic emotion analysis.
+
+    Binary frames are media: b"A" + mono PCM audio, or b"V" + one JPEG
+    frame. Text frames are JSON control messages: "start" (audio settings),
+    "message" (fuse the live estimate with the text and reply) and "reset".
+    """
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    session = LiveSession(emotion_recog)
+    last_update = 0.0
+    try:
+        while True:
+            data = await websocket.receive()
+            if data["type"] == "websocket.disconnect":
+                break
+            
+            if data.get("bytes"):
+                payload = data["bytes"]
+                try:
+                    # Feature extraction is CPU work; keep it off the event loop
+                    if payload[:1] == AUDIO_TAG:
+                        await loop.run_in_executor(None, session.add_audio, payload[1:])
+                    elif payload[:1] == VIDEO_TAG:
+                        await loop.run_in_executor(None, session.add_frame, payload[1:], loop.time())
+                    else:
+                        raise ValueError("Unknown media tag")
+                except ValueError as e:
+                    await websocket.send_text(json.dumps({"type": "error", "detail": str(e)}))
+                    continue
+                except Exception as e:
+                    # The analysis state may be half-updated; start the utterance over
+                    print(f"Live analysis error: {e}")
+                    await websocket.send_text(json.dumps({"type": "error", "detail": "Media analysis failed; session reset"}))
+                    session = LiveSession(emotion_recog, sample_rate=session.sample_rate,
+                                          audio_format=session.audio_format)
+                    continue
+                
+                # Throttle progress updates to the client
+                if loop.time() - last_update >= LIVE_UPDATE_INTERVAL:
+                    last_update = loop.time()
+                    await websocket.send_text(json.dumps({"type": "estimate", **session.estimate()}))
+                continue
+            
+            try:
+                message_data = json.loads(data.get("text") or "{}")
+                if not isinstance(message_data, dict):
+                    raise ValueError("Expected a JSON object")
+            except ValueError:
+                await websocket.send_text(json.dumps({"type": "error", "detail": "Invalid JSON message"}))
+                continue
+            if message_data.get("type") == "start":
+                try:
+                    session = LiveSession(
+                        emotion_recog,
+                        sample_rate=int(message_data.get("sample_rate", 16000)),
+                        audio_format=message_data.get("audio_format", "pcm_s16le")
+                    )
+                except ValueError as e:
+                    await websocket.send_text(json.dumps({"type": "error", "detail": str(e)}))
+                    continue
+                await websocket.send_text(json.dumps({"type": "started"}))
+            elif message_data.get("type") == "reset":
+                session = LiveSession(emotion_recog, sample_rate=session.sample_rate,
+                                      audio_format=session.audio_format)
+            elif message_data.get("type") == "message":
+                # The fused emotion is ready as soon as the text arrives
+                emotion = await loop.run_in_executor(None, session.fuse, message_data["message"])
+                crisis_type = emotion.get("crisis_type")
+                response = await chatbot.generate_response(
+                    message_data["message"],
+                    user_id,
+                    emotion,
+                    message_data.get("context", [])
+                )
+                final_emotion = emotion.get("final_emotion", emotion.get("multimodal_emotion", emotion["label"]))
+                final_confidence = emotion.get("final_confidence", emotion.get("multimodal_confidence", emotion["confidence"]))
+                await websocket.send_text(json.dumps({
+                    "type": "bot",
+                    "content": response,
+                    "emotion": "crisis" if crisis_type else final_emotion,
+                    "confidence": final_confidence,
+                    "crisis_detected": crisis_type is not None,
+                    "crisis_type": crisis_type,
+                    "audio_analysis": emotion.get("audio_analysis"),
+                    "video_analysis": emotion.get("video_analysis")
+                }))
+                # Each message starts a new utterance
+                session = LiveSession(emotion_recog, sample_rate=session.sample_rate,
+                                      audio_format=session.audio_format)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Live WebSocket error: {e}")
+    print(f"Live client {user_id} disconnected")
+
 @app.post("/profile")
 async def create_profile(profile: UserProfile):
     # For demo, store in memory
@@ -252,6 +439,56 @@ async def get_profile(user_id: str):
 async def health_check():
     return {"status": "healthy", "version": "1.0.0", "features": ["multimodal", "crisis_detection"]}
 
+@app.get("/metrics")
+async def metrics():
+    """Cache and queue counters for monitoring."""
+    return {
+        "emotion_cache": emotion_recog.cache_stats(),
+        "media_cache": emotion_recog.media_cache_stats(),
+        "llm": chatbot.llm_stats(),
+        "summarizer": chatbot.summarizer.stats(),
+        "analysis_pool": analysis_pool.stats(),
+        "jobs": {"running_tasks": len(job_tasks), **job_store.stats()},
+        "uploads": {
+            "pending_writes": len(persist_tasks),
+            **upload_store.stats(),
+            "janitor": upload_janitor.stats()
+        }
+    }
+
+async def store_upload(file: UploadFile, kind: str, owner: str, max_bytes: int) -> dict:
+    """Stream an upload into the blob store and return its blob id and path."""
+    temp_path = upload_store.temp_path()
+    upload = await stream_upload(file, temp_path, max_bytes=max_bytes)
+    blob = await asyncio.to_thread(
+        upload_store.add, temp_path, upload["sha256"], upload["size"], kind, file.filename, owner
+    )
+    # The blob id is the content hash, so the media cache never re-hashes the file
+    emotion_recog.remember_digest(blob["path"], blob["blob_id"])
+    return blob
+
+def resolve_media_blobs(request: MultimodalChatRequest, owner: str) -> MultimodalChatRequest:
+    """Swap blob ids on a multimodal request for the stored file paths."""
+    updates = {}
+    for blob_field, path_field in (("audio_blob_id", "audio_file"), ("video_blob_id", "video_file")):
+        blob_id = getattr(request, blob_field)
+        if blob_id:
+            path = upload_store.resolve(blob_id, owner)
+            if path is None:
+                raise HTTPException(status_code=404, detail=f"Unknown {blob_field}: {blob_id}")
+            emotion_recog.remember_digest(path, blob_id)
+            updates[path_field] = path
+    return request.model_copy(update=updates) if updates else request
+
+@app.get("/upload/usage")
+async def upload_usage(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Storage used by the current user's uploads, and the quota it counts against."""
+    token = credentials.credentials
+    current_user = await get_current_active_user(await get_current_user(token))
+    
+    usage = await asyncio.to_thread(upload_store.user_usage, current_user.username)
+    return {**usage, "quota_bytes": upload_janitor.max_user_bytes or None, "retention": upload_janitor.retention or None}
+
 @app.post("/upload/audio")
 async def upload_audio(
     file: UploadFile = File(...),
@@ -264,19 +501,23 @@ async def upload_audio(
         current_user = await get_current_active_user(await get_current_user(token))
         
         # Validate file type
-        if not file.filename or not file.filename.lower().endswith(('.wav', '.mp3', '.m4a', '.flac')):
+        if not file.filename or not file.filename.lower().endswith(AUDIO_EXTENSIONS):
             raise HTTPException(status_code=400, detail="Unsupported audio format")
         
-        # Create uploads directory if it doesn't exist
-        upload_dir = "uploads/audio"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Save file with unique name
-        file_path = f"{upload_dir}/{current_user.username}_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Store by content; identical files are kept once
+        blob = await store_upload(file, "audio", current_user.username, UPLOAD_MAX_AUDIO_BYTES)
         
-        return {"file_path": file_path, "message": "Audio file uploaded successfully"}
+        return {
+            "blob_id": blob["blob_id"],
+            "file_path": blob["path"],
+            "size": blob["size"],
+            "deduplicated": blob["deduplicated"],
+            "message": "Audio file uploaded successfully"
+        }
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -292,22 +533,88 @@ async def upload_video(
         current_user = await get_current_active_user(await get_current_user(token))
         
         # Validate file type
-        if not file.filename or not file.filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
+        if not file.filename or not file.filename.lower().endswith(VIDEO_EXTENSIONS):
             raise HTTPException(status_code=400, detail="Unsupported video format")
         
-        # Create uploads directory if it doesn't exist
-        upload_dir = "uploads/video"
-        os.makedirs(upload_dir, exist_ok=True)
+        # Store by content; identical files are kept once
+        blob = await store_upload(file, "video", current_user.username, UPLOAD_MAX_VIDEO_BYTES)
         
-        # Save file with unique name
-        file_path = f"{upload_dir}/{current_user.username}_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        return {"file_path": file_path, "message": "Video file uploaded successfully"}
+        return {
+            "blob_id": blob["blob_id"],
+            "file_path": blob["path"],
+            "size": blob["size"],
+            "deduplicated": blob["deduplicated"],
+            "message": "Video file uploaded successfully"
+        }
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def process_multimodal_chat(request: MultimodalChatRequest,
+                                  media: Optional[Dict[str, Union[str, bytes]]] = None,
+                                  digests: Optional[Dict[str, str]] = None) -> ChatResponse:
+    """Multimodal analysis, reply and profile update shared by the multimodal endpoints.
+
+    `media` maps "audio"/"video" to paths or in-memory bytes that take the
+    place of the request's files; `digests` to their SHA-256s, if known.
+    """
+    media = media or {}
+    # Perform multimodal emotion analysis on the worker pool
+    emotion = await emotion_recog.analyze_multimodal_async(
+        text=request.message,
+        audio_path=media.get("audio", request.audio_file),
+        image_path=media.get("video", request.video_file),
+        pool=analysis_pool,
+        digests=digests
+    )
+    
+    # Check for crisis situation
+    crisis_detected = emotion.get("crisis_detected", False)
+    crisis_type = emotion.get("crisis_type", None)
+    
+    # Get chatbot response with multimodal context
+    response = await chatbot.generate_response(
+        request.message, 
+        request.user_id, 
+        emotion,
+        request.context
+    )
+    
+    # Update digital twin (only if database is available)
+    if get_database() is not None:
+        await digital_twin.update_profile(request.user_id, {
+            "message": request.message,
+            "emotion": emotion.get("multimodal_emotion", emotion.get("label", "neutral")),
+            "response": response,
+            "crisis_detected": crisis_detected,
+            "crisis_type": crisis_type,
+            "multimodal": True,
+            "audio_analysis": emotion.get("audio_analysis"),
+            "video_analysis": emotion.get("video_analysis")
+        })
+    
+    # Return response with multimodal emotion data
+    final_emotion = emotion.get("final_emotion", emotion.get("multimodal_emotion", emotion.get("label", "neutral")))
+    final_confidence = emotion.get("final_confidence", emotion.get("multimodal_confidence", emotion.get("confidence", 0.5)))
+    
+    if crisis_detected:
+        return ChatResponse(
+            response=response,
+            emotion="crisis",
+            confidence=final_confidence,
+            crisis_detected=True,
+            crisis_type=crisis_type
+        )
+    
+    return ChatResponse(
+        response=response,
+        emotion=final_emotion,
+        confidence=final_confidence
+    )
+
 @app.post("/chat/multimodal", response_model=ChatResponse)
 async def multimodal_chat_endpoint(
     request: MultimodalChatRequest,
@@ -319,59 +626,141 @@ async def multimodal_chat_endpoint(
         token = credentials.credentials
         current_user = await get_current_active_user(await get_current_user(token))
         
-        # Perform multimodal emotion analysis
-        emotion = emotion_recog.analyze_multimodal(
-            text=request.message,
-            audio_path=request.audio_file,
-            image_path=request.video_file
-        )
-        
-        # Check for crisis situation
-        crisis_detected = emotion.get("crisis_detected", False)
-        crisis_type = emotion.get("crisis_type", None)
+        request = resolve_media_blobs(request, current_user.username)
+        return await process_multimodal_chat(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def persist_upload(data: bytes, digest: str, kind: str, filename: str, owner: str):
+    """Save an upload that was analysed from memory to the blob store."""
+    try:
+        blob = await asyncio.to_thread(upload_store.add, data, digest, len(data), kind, filename, owner)
+        emotion_recog.remember_digest(blob["path"], digest)
+    except Exception as e:
+        print(f"Error saving {kind} upload {digest}: {e}")
+
+@app.post("/chat/multimodal/upload", response_model=MultimodalUploadResponse)
+async def multimodal_upload_chat(
+    message: str = Form(...),
+    user_id: str = Form(...),
+    audio: Optional[UploadFile] = File(None),
+    video: Optional[UploadFile] = File(None),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Upload audio/video and get the multimodal reply in a single request.
+
+    Files up to UPLOAD_MEMORY_LIMIT are read into memory, analysed from
+    there and saved to the blob store in the background; larger ones are
+    streamed to the store first and analysed from there. Note that the
+    multipart parser already spools parts over 1 MB to a temporary file,
+    so only small files never touch disk.
+    """
+    try:
+        # Verify token
+        token = credentials.credentials
+        current_user = await get_current_active_user(await get_current_user(token))
         
-        # Get chatbot response with multimodal context
-        response = await chatbot.generate_response(
-            request.message, 
-            request.user_id, 
-            emotion,
-            request.context
+        media = {}
+        digests = {}
+        uploads = (
+            ("audio", audio, AUDIO_EXTENSIONS, UPLOAD_MAX_AUDIO_BYTES),
+            ("video", video, VIDEO_EXTENSIONS, UPLOAD_MAX_VIDEO_BYTES)
         )
+        for kind, file, extensions, max_bytes in uploads:
+            if file is None:
+                continue
+            if not file.filename or not file.filename.lower().endswith(extensions):
+                raise HTTPException(status_code=400, detail=f"Unsupported {kind} format")
+            
+            if file.size is not None and file.size <= UPLOAD_MEMORY_LIMIT:
+                data, digests[kind] = await read_upload(file, max_bytes=max_bytes)
+                media[kind] = data
+                task = asyncio.create_task(
+                    persist_upload(data, digests[kind], kind, file.filename, current_user.username)
+                )
+                persist_tasks.add(task)
+                task.add_done_callback(persist_tasks.discard)
+            else:
+                blob = await store_upload(file, kind, current_user.username, max_bytes)
+                media[kind] = blob["path"]
+                digests[kind] = blob["blob_id"]
         
-        # Update digital twin (only if database is available)
-        if get_database() is not None:
-            await digital_twin.update_profile(request.user_id, {
-                "message": request.message,
-                "emotion": emotion.get("multimodal_emotion", emotion.get("label", "neutral")),
-                "response": response,
-                "crisis_detected": crisis_detected,
-                "crisis_type": crisis_type,
-                "multimodal": True,
-                "audio_analysis": emotion.get("audio_analysis"),
-                "video_analysis": emotion.get("video_analysis")
-            })
-        
-        # Return response with multimodal emotion data
-        final_emotion = emotion.get("final_emotion", emotion.get("multimodal_emotion", emotion.get("label", "neutral")))
-        final_confidence = emotion.get("final_confidence", emotion.get("multimodal_confidence", emotion.get("confidence", 0.5)))
-        
-        if crisis_detected:
-            return ChatResponse(
-                response=response,
-                emotion="crisis",
-                confidence=final_confidence,
-                crisis_detected=True,
-                crisis_type=crisis_type
-            )
-        
-        return ChatResponse(
-            response=response,
-            emotion=final_emotion,
-            confidence=final_confidence
+        request = MultimodalChatRequest(message=message, user_id=user_id)
+        result = await process_multimodal_chat(request, media, digests)
+        return MultimodalUploadResponse(
+            **result.model_dump(),
+            audio_blob_id=digests.get("audio"),
+            video_blob_id=digests.get("video")
         )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def run_multimodal_job(job_id: str, request: MultimodalChatRequest, owner: str):
+    """Background body of a multimodal job; pushes the outcome to the owner's chat socket.
+
+    `owner` is the authenticated username the job belongs to, never the
+    client-supplied request.user_id.
+    """
+    job_store.update(job_id, status="running")
+    try:
+        result = await process_multimodal_chat(request)
+        job = job_store.update(job_id, status="completed", result=result.model_dump())
+    except Exception as e:
+        print(f"Multimodal job {job_id} failed: {e}")
+        job = job_store.update(job_id, status="failed", error=str(e))
+    
+    if job is not None:
+        try:
+            await manager.send_personal_message(json.dumps({
+                "type": "job",
+                **job_store.public_view(job)
+            }), owner)
+        except Exception as e:
+            # Polling still works when the push cannot be delivered
+            print(f"Could not push job {job_id} to {owner}: {e}")
+
+@app.post("/chat/multimodal/jobs", status_code=202)
+async def submit_multimodal_job(
+    request: MultimodalChatRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Queue multimodal analysis and reply generation; returns a job id immediately."""
+    token = credentials.credentials
+    current_user = await get_current_active_user(await get_current_user(token))
+    
+    request = resolve_media_blobs(request, current_user.username)
+    job = job_store.create(current_user.username, "multimodal_chat")
+    task = asyncio.create_task(run_multimodal_job(job["job_id"], request, current_user.username))
+    # Keep a reference so the task is not garbage collected mid-run
+    job_tasks.add(task)
+    task.add_done_callback(job_tasks.discard)
+    
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/chat/multimodal/jobs/{job['job_id']}"
+    }
+
+@app.get("/chat/multimodal/jobs/{job_id}")
+async def get_multimodal_job(
+    job_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Poll a multimodal job; `result` holds the chat response once completed."""
+    token = credentials.credentials
+    current_user = await get_current_active_user(await get_current_user(token))
+    
+    job = job_store.get(job_id)
+    if job is None or job["owner"] != current_user.username:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_store.public_view(job)
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
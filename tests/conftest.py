@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """main imported against a scratch working directory, fake LLM and in-process analysis."""
+    workdir = tmp_path_factory.mktemp("server")
+    previous = os.getcwd()
+    os.chdir(workdir)
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "ANALYSIS_WORKERS": "0",
+        "LLM_CACHE_BACKEND": "memory",
+        "MEDIA_CACHE_BACKEND": "memory"
+    })
+    import main
+    yield main
+    os.chdir(previous)
+
+
+@pytest.fixture
+def client(app_module):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_module.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post("/auth/login", json={"username": "testuser", "password": "password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import runpy
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from ai.analysis_pool import AnalysisPool, AnalysisQueueFull, AnalysisTimeout
+from ai.emotion_recognition import EmotionRecognition
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pool") / "tone.wav"
+    t = np.arange(22050 * 3) / 22050
+    sf.write(path, (0.1 * np.sin(2 * np.pi * 180 * t)).astype(np.float32), 22050)
+    return str(path)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_thread_mode_without_workers(clip):
+    pool = AnalysisPool(max_workers=0)
+    pool.start()
+    result = run(pool.run("audio", clip))
+    assert result["emotion"] in ("neutral", "sad")
+    assert pool.stats()["mode"] == "thread"
+
+
+def test_timeout_recycles_the_pool(clip):
+    pool = AnalysisPool(max_workers=1, max_queue=4, timeout=30)
+    pool.start()
+    try:
+        first = pool._current
+        with pytest.raises(AnalysisTimeout):
+            run(pool.run("audio", clip, timeout=0.001))
+        assert pool.stats()["timeouts"] == 1
+        assert pool.stats()["recycled_pools"] == 1
+        assert pool._current is not first
+
+        # New jobs go to the fresh workers
+        assert "error" not in run(pool.run("audio", clip))
+    finally:
+        pool.shutdown()
+
+
+def test_workers_are_replaced_after_max_tasks(clip):
+    pool = AnalysisPool(max_workers=1, max_tasks_per_worker=1)
+    pool.start()
+    try:
+        async def three_jobs():
+            return [await pool.run("audio", clip) for _ in range(3)]
+
+        results = run(three_jobs())
+        assert all("error" not in result for result in results)
+        assert pool.stats()["completed"] == 3
+    finally:
+        pool.shutdown()
+
+
+def test_full_queue_rejects_jobs(clip):
+    pool = AnalysisPool(max_workers=1, max_queue=0)
+    pool.start()
+    try:
+        async def two_jobs():
+            return await asyncio.gather(pool.run("audio", clip), pool.run("audio", clip),
+                                        return_exceptions=True)
+
+        results = run(two_jobs())
+        assert isinstance(results[1], AnalysisQueueFull)
+        assert pool.stats()["rejected"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_worker_import_of_main_builds_nothing(monkeypatch, tmp_path):
+    # Spawned workers run main.py as __mp_main__; only the app starting up may build components
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    namespace = runpy.run_path(os.path.join(os.path.dirname(__file__), "..", "main.py"),
+                               run_name="__mp_main__")
+    for name in ("chatbot", "emotion_recog", "digital_twin", "analysis_pool", "upload_store"):
+        assert namespace[name] is None, name
+
+
+class SlowPool:
+    """Stands in for AnalysisPool with a fixed per-job delay."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.jobs = 0
+
+    async def run(self, kind, path):
+        self.jobs += 1
+        await asyncio.sleep(self.delay)
+        return {"emotion": "excited", "confidence": 0.7}
+
+
+def test_slow_analysis_degrades_to_text_and_is_cached_later(clip):
+    analyzer = EmotionRecognition(cache_size=0, media_cache_backend="memory")
+    pool = SlowPool(0.3)
+
+    async def chat():
+        started = time.monotonic()
+        first = await analyzer.analyze_multimodal_async("so happy", audio_path=clip, pool=pool,
+                                                        timeouts={"audio": 0.05})
+        elapsed = time.monotonic() - started
+        await asyncio.gather(*analyzer._late_analyses)
+        second = await analyzer.analyze_multimodal_async("so happy", audio_path=clip, pool=pool,
+                                                         timeouts={"audio": 0.05})
+        return first, elapsed, second
+
+    first, elapsed, second = run(chat())
+    assert elapsed < 0.25
+    assert "error" in first["audio_analysis"]
+    assert first["multimodal_emotion"] == "happy"
+    assert second["audio_analysis"] == {"emotion": "excited", "confidence": 0.7}
+    assert pool.jobs == 1
+
+
+def test_slow_cache_lookup_degrades_to_text(clip, monkeypatch):
+    analyzer = EmotionRecognition(cache_size=0, media_cache_backend="memory")
+    lookup = analyzer._media_cache_lookup
+
+    def slow_lookup(*args):
+        # Hashing a huge or slow file before the cache can answer
+        time.sleep(0.5)
+        return lookup(*args)
+
+    monkeypatch.setattr(analyzer, "_media_cache_lookup", slow_lookup)
+
+    async def chat():
+        started = time.monotonic()
+        result = await analyzer.analyze_multimodal_async("so happy", audio_path=clip, pool=SlowPool(0),
+                                                         timeouts={"audio": 0.05})
+        return result, time.monotonic() - started
+
+    result, elapsed = run(chat())
+    assert elapsed < 0.4
+    assert "error" in result["audio_analysis"]
+    assert result["multimodal_emotion"] == "happy"
+
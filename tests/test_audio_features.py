@@ -0,0 +1,60 @@
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+from ai.audio_features import extract_audio_features
+from ai.emotion_recognition import EmotionRecognition
+
+
+def baseline_features(path):
+    """Features as the original analyze_audio computed them: whole file at 22.05 kHz."""
+    y, sr = librosa.load(path, duration=30)
+    f0 = librosa.yin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'))
+    return {
+        "pitch_mean": float(np.mean(f0[f0 > 0])),
+        "energy_mean": float(np.mean(librosa.feature.rms(y=y))),
+        "centroid_mean": float(np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))),
+        "zcr_mean": float(np.mean(librosa.feature.zero_crossing_rate(y)))
+    }
+
+
+def write_tone(path, sr, frequency=180.0, amplitude=0.12, noise=0.02, seconds=4.3, channels=1):
+    rng = np.random.default_rng(sr)
+    t = np.arange(int(sr * seconds)) / sr
+    y = amplitude * np.sin(2 * np.pi * frequency * t) + noise * rng.standard_normal(len(t))
+    if channels > 1:
+        y = np.stack([y] * channels, axis=1)
+    sf.write(path, y.astype(np.float32), sr)
+    return str(path)
+
+
+@pytest.mark.parametrize("sr", [16000, 22050, 44100, 48000])
+def test_streamed_features_match_whole_file_baseline(tmp_path, sr):
+    path = write_tone(tmp_path / "tone.wav", sr)
+    expected = baseline_features(path)
+    # Small blocks so the stream crosses many block boundaries
+    features = extract_audio_features(path, block_frames=16)
+    for key, value in expected.items():
+        assert features[key] == pytest.approx(value, rel=1e-3), key
+    assert features["duration"] == pytest.approx(4.3, abs=1e-3)
+
+
+def test_stereo_is_downmixed_like_librosa(tmp_path):
+    path = write_tone(tmp_path / "stereo.wav", 44100, channels=2)
+    features = extract_audio_features(path)
+    for key, value in baseline_features(path).items():
+        assert features[key] == pytest.approx(value, rel=1e-3), key
+
+
+def test_max_duration_caps_the_analysis(tmp_path):
+    path = write_tone(tmp_path / "long.wav", 48000, seconds=6.0)
+    assert extract_audio_features(path, max_duration=2.0)["duration"] == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize("sr", [16000, 44100, 48000])
+def test_high_rate_tone_keeps_baseline_label(tmp_path, sr):
+    analyzer = EmotionRecognition(cache_size=0, media_cache_backend="none")
+    path = write_tone(tmp_path / "tone.wav", sr)
+    assert analyzer.classify_audio_features(baseline_features(path))[0] == "neutral"
+    assert analyzer.analyze_audio(path)["emotion"] == "neutral"
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from ai.audio_features import extract_audio_features, extract_audio_features_fast
+from ai.emotion_recognition import EmotionRecognition
+from benchmark_audio import synthesize_clips
+
+
+@pytest.fixture(scope="module")
+def clips(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("clips")
+    paths = synthesize_clips(str(directory))
+    # The plain tone that drifted to "anxious" when features were taken at 48 kHz
+    for sr in (16000, 44100, 48000):
+        t = np.arange(4 * sr) / sr
+        y = 0.12 * np.sin(2 * np.pi * 180 * t) + 0.02 * np.random.default_rng(sr).standard_normal(len(t))
+        path = directory / f"tone_{sr}.wav"
+        sf.write(path, y.astype(np.float32), sr)
+        paths.append(str(path))
+    return paths
+
+
+def test_fast_tier_frame_features_match_accurate_tier(clips):
+    for path in clips:
+        accurate = extract_audio_features(path)
+        fast = extract_audio_features_fast(path)
+        for key in ("energy_mean", "zcr_mean", "centroid_mean", "duration"):
+            assert fast[key] == pytest.approx(accurate[key], rel=1e-3), (path, key)
+
+
+def test_fast_tier_labels_agree_with_accurate_tier(clips, monkeypatch):
+    labels = {}
+    for quality in ("accurate", "fast"):
+        monkeypatch.setenv("AUDIO_QUALITY", quality)
+        analyzer = EmotionRecognition(cache_size=0, media_cache_backend="none")
+        labels[quality] = [analyzer.analyze_audio(path)["emotion"] for path in clips]
+    assert labels["fast"] == labels["accurate"]
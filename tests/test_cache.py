@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import types
+
+import pytest
+
+from ai import cache as cache_module
+from ai.cache import DiskCache, TTLCache, build_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual clock behind both time.monotonic and time.time in ai.cache."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(monotonic=lambda: now[0], time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture(params=["memory", "disk"])
+def make_cache(request, tmp_path):
+    def make(max_size=3, ttl=None):
+        return build_cache(request.param, max_size=max_size, ttl=ttl, path=str(tmp_path / "cache.sqlite3"))
+    return make
+
+
+def test_least_recently_used_entry_is_evicted(make_cache, clock):
+    cache = make_cache(max_size=3)
+    for key in "abc":
+        cache.set(key, key.upper())
+        clock[0] += 1
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    clock[0] += 1
+    cache.set("d", "D")
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["A", "C", "D"]
+    assert cache.stats()["evictions"] == 1
+    assert len(cache) == 3
+
+
+def test_entries_expire_after_ttl(make_cache, clock):
+    cache = make_cache(ttl=10)
+    cache.set("a", {"emotion": "sad"})
+    clock[0] += 9
+    assert cache.get("a") == {"emotion": "sad"}
+    clock[0] += 2
+    assert cache.get("a", "missing") == "missing"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+    assert len(cache) == 0
+
+
+def test_disk_cache_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    DiskCache(path).set("reply", "Hello again")
+    assert DiskCache(path).get("reply") == "Hello again"
+
+
+def test_disk_cache_byte_budget_keeps_newest(tmp_path, clock):
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=50)
+    for key in "abc":
+        cache.set(key, "x" * 20)
+        clock[0] += 1
+    assert cache.get("a") is None
+    assert cache.get("c") == "x" * 20
+    assert cache.stats()["bytes"] <= 50
+
+
+def test_build_cache_backends(tmp_path):
+    assert build_cache("none", max_size=10) is None
+    assert build_cache("memory", max_size=0) is None
+    assert isinstance(build_cache("memory", max_size=10), TTLCache)
+    with pytest.raises(ValueError):
+        build_cache("disk", max_size=10)
+    with pytest.raises(ValueError):
+        build_cache("redis", max_size=10)
+
+
+def test_chatbot_disk_cache_runs_off_the_event_loop(tmp_path, monkeypatch):
+    from ai.chatbot import Chatbot
+
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "disk")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "responses.sqlite3"))
+    chatbot = Chatbot()
+    threads = []
+    for name in ("get", "set"):
+        method = getattr(chatbot.response_cache, name)
+        monkeypatch.setattr(chatbot.response_cache, name,
+                            lambda *args, method=method: threads.append(threading.get_ident()) or method(*args))
+
+    async def round_trip():
+        await chatbot._cache_response("key", "Take a slow breath with me.")
+        return await chatbot._cached_response("key"), threading.get_ident()
+
+    cached, loop_thread = asyncio.run(round_trip())
+    assert cached == "Take a slow breath with me."
+    assert len(threads) == 2 and loop_thread not in threads
@@ -0,0 +1,100 @@
+import asyncio
+import random
+
+import pytest
+
+from ai.chatbot import Chatbot
+from ai.emotion_recognition import EmotionRecognition
+from ai.fusion import label_distribution
+from ai.llm_backend import FakeBackend
+
+SAD_REPLY = "I can sense you're feeling down. Would you like to talk about what's bothering you?"
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return EmotionRecognition(cache_size=0, media_cache_backend="none")
+
+
+@pytest.fixture
+def chatbot(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "memory")
+    return Chatbot(llm_backend=FakeBackend())
+
+
+def test_disagreeing_modalities_keep_the_keyword_shortcut(analyzer, chatbot):
+    message = "i feel sad and worried"
+    audio = {"emotion": "excited", "confidence": 0.7, "probabilities": label_distribution("excited", 0.7)}
+    video = {"emotion": "happy", "confidence": 1.0, "probabilities": {"happy": 1.0}}
+    emotion = analyzer.combine_multimodal(analyzer.analyze_text(message), audio, video)
+    # Spread over nine emotions, the fused probability is below the shortcut cut-off
+    assert emotion["multimodal_confidence"] <= 0.3
+
+    assert chatbot.route(message, emotion) == SAD_REPLY
+    assert asyncio.run(chatbot.generate_response(message, "u1", emotion)) == SAD_REPLY
+    assert chatbot.llm_backend.calls == 0
+
+
+def test_fused_label_triggers_its_shortcut(analyzer, chatbot):
+    video = {"emotion": "sad", "confidence": 1.0, "probabilities": {"sad": 1.0}}
+    emotion = analyzer.combine_multimodal(analyzer.analyze_text("hello there"), None, video)
+    assert emotion["multimodal_emotion"] == "sad"
+    assert chatbot.route("hello there", emotion) == SAD_REPLY
+
+
+def test_uncertain_text_skips_the_shortcuts(analyzer, chatbot):
+    message = "sad worried angry happy"
+    emotion = analyzer.analyze_text(message)
+    assert emotion["confidence"] <= 0.3
+    assert chatbot.route(message, emotion) == chatbot.route(message)
+
+
+def baseline_route(chatbot, message, emotion=None):
+    """route as written before the routing table: one substring scan per table, in order."""
+    message_lower = message.lower().strip()
+    if emotion is not None:
+        label = emotion.get('multimodal_emotion', emotion.get('label', 'neutral'))
+        if emotion.get('confidence', 0.5) > 0.3:
+            for shortcut_label, keywords, response in chatbot.emotion_shortcuts:
+                if label == shortcut_label or any(keyword in message_lower for keyword in keywords):
+                    return response
+
+    for keyword, response in chatbot.keyword_responses.items():
+        if keyword in message_lower:
+            return response
+    for key, response in chatbot.responses.items():
+        if key in message_lower and key != 'default':
+            return response
+    for keyword, info in chatbot.knowledge_keywords.items():
+        if keyword in message_lower:
+            return f"{chatbot.responses['default']} {info}"
+
+    if len(message_lower.split()) <= 2:
+        return "I hear you. Can you tell me more about that?"
+    elif '?' in message_lower:
+        return "That's a good question. How are you feeling about it?"
+    elif any(word in message_lower for word in chatbot.feeling_words):
+        return "Thanks for sharing how you're feeling. Can you tell me more about what's causing that?"
+    return chatbot.responses['default']
+
+
+def random_messages(chatbot, count=2000, seed=11):
+    """Messages stitched from routing keywords, their fragments and filler, in mixed case."""
+    rng = random.Random(seed)
+    keywords = (list(chatbot.keyword_responses) + list(chatbot.responses) + list(chatbot.knowledge_keywords)
+                + [keyword for _, words, _ in chatbot.emotion_shortcuts for keyword in words] + chatbot.feeling_words)
+    pieces = keywords + [keyword[:rng.randint(1, len(keyword))] for keyword in keywords]
+    pieces += ["i", "so", "today", "really", "?", "not", "my", " "]
+    messages = []
+    for _ in range(count):
+        text = rng.choice([" ", "", ", "]).join(rng.choices(pieces, k=rng.randint(0, 8)))
+        messages.append("".join(char.upper() if rng.random() < 0.2 else char for char in text))
+    return messages
+
+
+def test_route_keeps_the_old_priority_order(analyzer, chatbot):
+    for message in random_messages(chatbot):
+        assert chatbot.route(message) == baseline_route(chatbot, message), message
+        emotion = analyzer.analyze_text(message)
+        assert chatbot.route(message, emotion) == baseline_route(chatbot, message, emotion), message
+
@@ -0,0 +1,30 @@
+import threading
+
+
+def test_batch_matches_single_text_analysis(client, auth_headers, app_module):
+    texts = ["I'm feeling anxious", "I had a great day", "", "sad and tired"]
+    response = client.post("/emotion/batch", headers=auth_headers, json={"texts": texts})
+    assert response.status_code == 200
+    assert response.json()["count"] == len(texts)
+    assert response.json()["results"] == [app_module.emotion_recog.analyze_text(text) for text in texts]
+
+
+def test_batch_is_scored_off_the_event_loop(client, auth_headers, app_module, monkeypatch):
+    threads = []
+    analyze_texts = app_module.emotion_recog.analyze_texts
+
+    def record(texts):
+        threads.append(threading.current_thread())
+        return analyze_texts(texts)
+
+    monkeypatch.setattr(app_module.emotion_recog, "analyze_texts", record)
+    response = client.post("/emotion/batch", headers=auth_headers, json={"texts": ["I had a great day"]})
+    assert response.status_code == 200
+    loop_thread = client.portal.call(threading.current_thread)
+    assert threads and threads[0] is not loop_thread
+
+
+def test_oversized_batch_is_rejected(client, auth_headers, app_module):
+    texts = ["hello"] * (app_module.EMOTION_BATCH_MAX_TEXTS + 1)
+    response = client.post("/emotion/batch", headers=auth_headers, json={"texts": texts})
+    assert response.status_code == 422
@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+
+from ai.emotion_recognition import EmotionRecognition
+from ai.fusion import DEFAULT_WEIGHTS, EMOTIONS, FusionEngine, label_distribution, parse_weights
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return EmotionRecognition(cache_size=0, media_cache_backend="none",
+                              fusion=FusionEngine(dict(DEFAULT_WEIGHTS)))
+
+
+def audio(emotion, confidence):
+    """Audio result shaped like _analyze_audio's."""
+    return {"emotion": emotion, "confidence": confidence, "probabilities": label_distribution(emotion, confidence)}
+
+
+def video(**shares):
+    """Video result shaped like _analyze_video's, from per-label frame shares."""
+    emotion = max(shares, key=shares.get)
+    return {"emotion": emotion, "confidence": shares[emotion], "probabilities": shares}
+
+
+FAILED = {"emotion": "neutral", "confidence": 0.5, "error": "decode failed"}
+
+
+def baseline_label(result, audio_result, video_result):
+    """Overall label under combine_multimodal as written before the FusionEngine."""
+    label, confidence, multimodal = result["label"], result["confidence"], None
+    if audio_result is not None and audio_result["confidence"] > 0.6:
+        if audio_result["emotion"] != label:
+            multimodal = audio_result["emotion"]
+    if video_result is not None and video_result["confidence"] > 0.6 and multimodal is None:
+        multimodal = video_result["emotion"]
+    return multimodal or label
+
+
+# Cases the old rules decided without a conflict between modalities
+AGREEING_CASES = [
+    ("hello there", audio("excited", 0.7), None),
+    ("hello there", audio("anxious", 0.65), None),
+    ("hello there", None, video(neutral=1.0)),
+    ("hello there", FAILED, video(neutral=0.9, sad=0.1)),
+    ("so happy", audio("neutral", 0.5), None),
+    ("so happy", FAILED, video(neutral=0.5, happy=0.5)),
+    ("so happy", audio("neutral", 0.5), video(happy=0.8, neutral=0.2)),
+    ("i feel sad and worried", audio("neutral", 0.5), None),
+    ("i feel sad and worried", audio("neutral", 0.5), video(neutral=0.4, sad=0.3, happy=0.3)),
+    ("i feel so sad", audio("sad", 0.6), video(sad=1.0)),
+    ("so angry and frustrated", audio("angry", 0.9), video(neutral=0.5, sad=0.5)),
+]
+
+
+@pytest.mark.parametrize("text, audio_result, video_result", AGREEING_CASES)
+def test_fused_label_agrees_with_old_rules(analyzer, text, audio_result, video_result):
+    result = analyzer.analyze_text(text)
+    expected = baseline_label(result, audio_result, video_result)
+    fused = analyzer.combine_multimodal(dict(result), audio_result, video_result)
+    assert fused["multimodal_emotion"] == expected
+    assert sum(fused["fused_scores"].values()) == pytest.approx(1.0, abs=1e-3)
+    assert fused["multimodal_confidence"] == pytest.approx(fused["fused_scores"][expected], abs=1e-4)
+
+
+def test_text_keywords_outweigh_a_single_audio_label(analyzer):
+    # The old rules let any audio label above 0.6 override the text outright
+    result = analyzer.analyze_text("so happy")
+    assert baseline_label(result, audio("anxious", 0.65), None) == "anxious"
+    fused = analyzer.combine_multimodal(dict(result), audio("anxious", 0.65), None)
+    assert fused["multimodal_emotion"] == "happy"
+
+
+def test_crisis_text_keeps_its_label(analyzer):
+    result = analyzer.analyze_text("i want to kill myself")
+    fused = analyzer.combine_multimodal(dict(result), audio("excited", 0.7), video(happy=1.0))
+    assert fused["multimodal_emotion"] == "crisis"
+    assert fused["multimodal_confidence"] == result["confidence"]
+    assert sum(fused["fused_scores"].values()) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_text_only_result_is_untouched(analyzer):
+    result = analyzer.analyze_text("i feel sad and worried")
+    assert analyzer.combine_multimodal(dict(result), None, None) == result
+
+
+def test_batched_fusion_matches_per_record(analyzer):
+    records = []
+    for text, audio_result, video_result in AGREEING_CASES:
+        record = analyzer.analyze_text(text)
+        if audio_result is not None:
+            record["audio_analysis"] = audio_result
+        if video_result is not None:
+            record["video_analysis"] = video_result
+        records.append(record)
+
+    for record, fused in zip(records, analyzer.fusion.fuse_results(records)):
+        single = analyzer.combine_multimodal(dict(record), record.get("audio_analysis"),
+                                             record.get("video_analysis"))
+        assert fused["emotion"] == single["multimodal_emotion"]
+        assert fused["confidence"] == pytest.approx(single["multimodal_confidence"])
+        assert fused["scores"] == single["fused_scores"]
+
+
+def test_weights_select_and_scale_modalities():
+    engine = FusionEngine({"audio": 1.0})
+    record = {"label": "happy", "confidence": 1.0, "all_scores": {"happy": 1.0},
+              "audio_analysis": audio("sad", 0.6)}
+    fused = engine.fuse_results([record])[0]
+    assert fused["emotion"] == "sad"
+    assert fused["scores"] == pytest.approx(label_distribution("sad", 0.6), abs=1e-4)
+
+    # Equal weights average the two distributions
+    fused = FusionEngine({"text": 1.0, "audio": 1.0}).fuse_results([record])[0]
+    assert fused["scores"]["happy"] == pytest.approx((1.0 + 0.4 / 8) / 2, abs=1e-4)
+
+
+def test_missing_modalities_are_ignored():
+    engine = FusionEngine(dict(DEFAULT_WEIGHTS))
+    probabilities = np.zeros((2, 3, len(EMOTIONS)))
+    probabilities[0, 2] = engine.vector({"happy": 3.0, "sad": 1.0})
+    fused, labels, confidence = engine.fuse(probabilities)
+
+    assert EMOTIONS[labels[0]] == "happy"
+    assert confidence[0] == pytest.approx(0.75)
+    assert EMOTIONS[labels[1]] == "neutral"
+    assert confidence[1] == 0.5
+
+
+def test_vector_normalises_and_drops_unknown_emotions():
+    engine = FusionEngine(dict(DEFAULT_WEIGHTS))
+    vector = engine.vector({"happy": 2.0, "sad": 2.0, "crisis": 5.0})
+    assert vector.sum() == pytest.approx(1.0)
+    assert vector[EMOTIONS.index("happy")] == pytest.approx(0.5)
+    assert not engine.vector({}).any()
+
+
+def test_label_distribution():
+    distribution = label_distribution("tired", 0.6)
+    assert sum(distribution.values()) == pytest.approx(1.0)
+    assert max(distribution, key=distribution.get) == "tired"
+    assert label_distribution("crisis", 0.95) == label_distribution("neutral", 0.5)
+
+
+def test_parse_weights():
+    assert parse_weights("") == DEFAULT_WEIGHTS
+    assert parse_weights(" audio = 0.2 ,video=0") == {"text": 1.0, "audio": 0.2, "video": 0.0}
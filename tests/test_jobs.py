@@ -0,0 +1,21 @@
+import time
+
+
+def test_job_result_is_pushed_to_the_authenticated_owner(client, auth_headers, app_module, monkeypatch):
+    pushed = []
+
+    async def record(message, user_id):
+        pushed.append(user_id)
+
+    monkeypatch.setattr(app_module.manager, "send_personal_message", record)
+    response = client.post("/chat/multimodal/jobs", headers=auth_headers,
+                           json={"message": "I feel fine", "user_id": "someone_else"})
+    assert response.status_code == 202
+
+    # The push follows the final status update
+    deadline = time.monotonic() + 10
+    while not pushed and time.monotonic() < deadline:
+        time.sleep(0.02)
+    job = client.get(response.json()["status_url"], headers=auth_headers).json()
+    assert job["status"] == "completed"
+    assert pushed == ["testuser"]
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from ai.emotion_recognition import EmotionRecognition
+from ai.keyword_matcher import CRISIS_KEYWORDS, EMOTION_KEYWORDS, KeywordMatcher, PhraseMatcher
+
+ALL_KEYWORDS = [keyword for groups in (CRISIS_KEYWORDS, EMOTION_KEYWORDS)
+                for keywords in groups.values() for keyword in keywords]
+
+
+def random_texts(count=500, seed=7):
+    """Texts stitched from keywords, keyword fragments and noise, in mixed case."""
+    rng = random.Random(seed)
+    pieces = ALL_KEYWORDS + [keyword[:rng.randint(1, len(keyword))] for keyword in ALL_KEYWORDS]
+    pieces += ["i", "feel", "so", "really", "today", " ", "-", "'", "!", "not", "down"]
+    texts = []
+    for _ in range(count):
+        words = rng.choices(pieces, k=rng.randint(0, 12))
+        separator = rng.choice([" ", "", "  ", ", "])
+        text = separator.join(words)
+        texts.append("".join(char.upper() if rng.random() < 0.2 else char for char in text))
+    return texts
+
+
+def baseline_analysis(text):
+    """analyze_text as written before the automaton: one substring test per keyword."""
+    text_lower = text.lower()
+    crisis_type = None
+    for category, keywords in CRISIS_KEYWORDS.items():
+        if any(keyword in text_lower for keyword in keywords):
+            crisis_type = category
+            break
+    scores = {emotion: 0.2 * sum(keyword in text_lower for keyword in keywords)
+              for emotion, keywords in EMOTION_KEYWORDS.items()}
+    total = sum(scores.values())
+    if total > 0:
+        scores = {emotion: score / total for emotion, score in scores.items()}
+    top_emotion, top_score = max(scores.items(), key=lambda item: item[1])
+    if crisis_type:
+        return "crisis", 0.95, crisis_type, scores
+    if top_score > 0.1:
+        return top_emotion, top_score, None, scores
+    return "neutral", 0.5, None, scores
+
+
+def test_automaton_finds_the_same_phrases_as_substring_search():
+    matcher = KeywordMatcher()
+    for text in random_texts():
+        expected = {keyword.lower() for keyword in ALL_KEYWORDS if keyword.lower() in text.lower()}
+        assert matcher.find_keywords(text) == expected, text
+
+
+def test_overlapping_and_nested_phrases():
+    matcher = PhraseMatcher(["he", "she", "his", "hers", "ushers"])
+    assert matcher.find_keywords("USHERS") == {"he", "she", "hers", "ushers"}
+    assert matcher.find_keywords("ahishers") == {"he", "she", "his", "hers"}
+    assert matcher.find_keywords("") == set()
+
+
+def test_crisis_type_follows_lexicon_order():
+    scan = KeywordMatcher().scan("I'm having a panic attack and feel hopeless, I want to hurt myself")
+    assert scan["crisis_type"] == "self_harm"
+    assert set(scan["crisis_hits"]) == {"self_harm", "hopeless", "panic"}
+
+
+def test_text_analysis_matches_the_per_keyword_baseline():
+    analyzer = EmotionRecognition(cache_size=0, media_cache_backend="none")
+    for text in random_texts(count=300, seed=11):
+        label, confidence, crisis_type, scores = baseline_analysis(text)
+        result = analyzer.analyze_text(text)
+        assert result["label"] == label, text
+        assert result["confidence"] == pytest.approx(confidence)
+        assert result.get("crisis_type") == crisis_type
+        for emotion, score in scores.items():
+            assert result["all_scores"][emotion] == pytest.approx(score)
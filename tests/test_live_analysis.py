@@ -0,0 +1,92 @@
+import json
+
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+from ai.audio_features import extract_audio_features
+from ai.emotion_recognition import EmotionRecognition
+from ai.live_analysis import AUDIO_TAG, LiveSession
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return EmotionRecognition(cache_size=0, media_cache_backend="none")
+
+
+def tone(sr, seconds=3.0, frequency=180.0):
+    t = np.arange(int(sr * seconds)) / sr
+    y = 0.12 * np.sin(2 * np.pi * frequency * t) + 0.02 * np.random.default_rng(sr).standard_normal(len(t))
+    return y.astype(np.float32)
+
+
+@pytest.mark.parametrize("sr", [16000, 48000])
+@pytest.mark.parametrize("chunk_bytes", [1001, 8192, 65536])
+def test_chunked_pcm_matches_file_analysis(tmp_path, analyzer, sr, chunk_bytes):
+    y = tone(sr)
+    pcm = (y * 32768).astype("<i2")
+    path = tmp_path / "tone.wav"
+    sf.write(path, pcm, sr, subtype="PCM_16")
+
+    session = LiveSession(analyzer, sample_rate=sr, block_seconds=0.25)
+    data = pcm.tobytes()
+    # Odd chunk sizes split samples across chunks
+    for start in range(0, len(data), chunk_bytes):
+        session.add_audio(data[start:start + chunk_bytes])
+    session.flush_audio()
+
+    expected = extract_audio_features(str(path))
+    features = session.audio_result()["features"]
+    for key, value in expected.items():
+        assert features[key] == pytest.approx(value, rel=1e-4), key
+
+
+def test_blocks_are_analysed_before_flush(analyzer):
+    session = LiveSession(analyzer, sample_rate=16000, audio_format="f32le", block_seconds=0.5)
+    assert session.audio_result() is None
+    session.add_audio(tone(16000, seconds=2.0).tobytes())
+    assert session.audio.frames > 0
+    assert session.audio_result()["emotion"] == "neutral"
+
+
+def test_pending_audio_stays_bounded(analyzer):
+    session = LiveSession(analyzer, sample_rate=48000, block_seconds=0.5)
+    chunk = (tone(48000, seconds=1.0) * 32768).astype("<i2").tobytes()
+    for _ in range(10):
+        session.add_audio(chunk)
+        assert len(session.audio._pending) <= session.audio._block_length + 22050
+    with pytest.raises(ValueError):
+        session.add_audio(b"\0" * (session._max_chunk_bytes + 2))
+
+
+@pytest.mark.parametrize("settings", [
+    {"sample_rate": 1_000_000_000},
+    {"sample_rate": 4000},
+    {"block_seconds": 0},
+    {"block_seconds": -1.0},
+    {"block_seconds": 60.0},
+    {"audio_format": "mp3"}
+])
+def test_invalid_settings_are_rejected(analyzer, settings):
+    with pytest.raises(ValueError):
+        LiveSession(analyzer, **settings)
+
+
+def test_socket_reports_errors_and_stays_open(client, app_module, monkeypatch):
+    def failing_add_audio(self, chunk):
+        raise librosa.util.exceptions.ParameterError("Audio buffer is not finite everywhere")
+
+    with client.websocket_connect("/ws/live/tester") as websocket:
+        websocket.send_text(json.dumps({"type": "start", "sample_rate": 1_000_000_000}))
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_text("not json")
+        assert websocket.receive_json()["type"] == "error"
+
+        monkeypatch.setattr(app_module.LiveSession, "add_audio", failing_add_audio)
+        websocket.send_bytes(AUDIO_TAG + b"\0\0" * 1600)
+        assert websocket.receive_json()["type"] == "error"
+        monkeypatch.undo()
+
+        websocket.send_bytes(AUDIO_TAG + (tone(16000, 1.0) * 32768).astype("<i2").tobytes())
+        assert websocket.receive_json()["type"] == "estimate"
@@ -0,0 +1,157 @@
+import asyncio
+import time
+import types
+
+import pytest
+
+from ai import llm_backend
+from ai.chatbot import Chatbot
+from ai.llm_backend import CircuitBreaker, FakeBackend, create_backend
+
+EMOTION = {"label": "neutral", "confidence": 0.5}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_backend, "time", types.SimpleNamespace(monotonic=lambda: now[0], sleep=time.sleep))
+    return now
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    breaker.record_success(0.1)
+    assert breaker.consecutive_failures == 0
+
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_half_open_breaker_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock[0] += 31
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_threshold=1.0)
+    breaker.record_success(0.5)
+    breaker.record_success(2.0)
+    breaker.record_success(3.0)
+    assert breaker.state == "open"
+    assert breaker.stats()["slow_calls"] == 2
+
+
+def test_create_backend(monkeypatch):
+    assert isinstance(create_backend("fake"), FakeBackend)
+    assert create_backend("none") is None
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    assert create_backend("gemini") is None
+
+
+def test_fake_backend_is_deterministic():
+    backend = FakeBackend()
+    assert backend.generate("hello") == backend.generate("hello")
+    assert "".join(backend.stream("hello")) == backend.generate("hello")
+
+
+@pytest.fixture
+def make_chatbot(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "memory")
+
+    def make(backend, **env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return Chatbot(llm_backend=backend)
+    return make
+
+
+def test_open_breaker_short_circuits_to_the_fallback(make_chatbot):
+    backend = FakeBackend(failure_rate=1.0)
+    chatbot = make_chatbot(backend, LLM_BREAKER_FAILURES="2", LLM_BREAKER_RESET="60")
+
+    async def chat():
+        return [await chatbot.generate_response(f"Tell me something {i}", "u1", EMOTION) for i in range(4)]
+
+    replies = asyncio.run(chat())
+    assert all(reply not in FakeBackend.replies for reply in replies)
+    assert backend.calls == 2
+    assert chatbot.llm_metrics["short_circuited"] == 2
+
+
+def test_hedged_reply_falls_back_and_caches_the_late_answer(make_chatbot):
+    backend = FakeBackend(latency=0.3)
+    chatbot = make_chatbot(backend, LLM_HEDGE_BUDGET="0.05")
+
+    async def chat():
+        started = time.monotonic()
+        first = await chatbot.generate_response("Tell me about your day", "u1", EMOTION)
+        elapsed = time.monotonic() - started
+        await asyncio.gather(*chatbot._background_tasks)
+        return first, elapsed
+
+    first, elapsed = asyncio.run(chat())
+    assert first not in FakeBackend.replies
+    assert elapsed < 0.25
+    assert chatbot.llm_metrics["hedged"] == 1
+    assert chatbot.response_cache.stats()["size"] == 1
+
+
+def test_deadline_falls_back_without_waiting_for_the_backend(make_chatbot):
+    chatbot = make_chatbot(FakeBackend(latency=0.5), GEMINI_TIMEOUT="0.05")
+    started = time.monotonic()
+    assert asyncio.run(chatbot._generate_gemini_response("Tell me about your day", "u1", EMOTION)) is None
+    assert time.monotonic() - started < 0.4
+    assert chatbot.llm_metrics["timeouts"] == 1
+    assert chatbot.circuit_breaker.consecutive_failures == 1
+
+
+def test_abandoned_stream_releases_the_half_open_probe(make_chatbot):
+    backend = FakeBackend(latency=0.05)
+    chatbot = make_chatbot(backend, LLM_BREAKER_FAILURES="1", LLM_BREAKER_RESET="0")
+    chatbot.circuit_breaker.record_failure()
+
+    async def chat():
+        stream = chatbot._stream_gemini_response("Tell me about your day", "u1", EMOTION)
+        assert await stream.__anext__()
+        # A /ws/chat client disconnecting mid-stream closes the generator
+        await stream.aclose()
+        assert not chatbot.circuit_breaker._probe_in_flight
+        return await chatbot._generate_gemini_response("Tell me something else", "u1", EMOTION)
+
+    assert asyncio.run(chat()) in FakeBackend.replies
+    assert chatbot.circuit_breaker.state == "closed"
+    assert chatbot.llm_metrics["short_circuited"] == 0
+
+
+def test_cancelled_call_releases_the_half_open_probe(make_chatbot):
+    chatbot = make_chatbot(FakeBackend(latency=0.3), LLM_BREAKER_FAILURES="1", LLM_BREAKER_RESET="0")
+    chatbot.circuit_breaker.record_failure()
+
+    async def chat():
+        task = asyncio.ensure_future(chatbot._generate_gemini_response("Tell me about your day", "u1", EMOTION))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return chatbot.circuit_breaker.allow()
+
+    assert asyncio.run(chat())
+
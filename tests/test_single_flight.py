@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from ai.chatbot import Chatbot
+from ai.llm_backend import FakeBackend
+
+EMOTION = {"label": "neutral", "confidence": 0.5}
+
+
+@pytest.fixture
+def make_chatbot(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "none")
+
+    def make(backend):
+        return Chatbot(llm_backend=backend)
+    return make
+
+
+def ask_concurrently(chatbot, count, message="Tell me about your day"):
+    async def ask():
+        return await asyncio.gather(*[
+            chatbot._generate_gemini_response(message, "u1", EMOTION) for _ in range(count)])
+    return asyncio.run(ask())
+
+
+def test_identical_concurrent_prompts_share_one_call(make_chatbot):
+    backend = FakeBackend(latency=0.2)
+    chatbot = make_chatbot(backend)
+    responses = ask_concurrently(chatbot, 5)
+    assert backend.calls == 1
+    assert len(set(responses)) == 1 and responses[0] in FakeBackend.replies
+    assert chatbot.llm_metrics["coalesced"] == 4
+    assert chatbot.llm_stats()["inflight_prompts"] == 0
+
+
+def test_different_prompts_are_not_coalesced(make_chatbot):
+    backend = FakeBackend(latency=0.05)
+    chatbot = make_chatbot(backend)
+
+    async def ask():
+        return await asyncio.gather(*[
+            chatbot._generate_gemini_response(f"Question {i}", "u1", EMOTION) for i in range(3)])
+
+    asyncio.run(ask())
+    assert backend.calls == 3
+    assert chatbot.llm_metrics["coalesced"] == 0
+
+
+def test_followers_fall_back_when_the_shared_call_fails(make_chatbot):
+    backend = FakeBackend(latency=0.1, failure_rate=1.0)
+    chatbot = make_chatbot(backend)
+    assert ask_concurrently(chatbot, 4) == [None] * 4
+    assert backend.calls == 1
+    assert chatbot.llm_metrics["errors"] == 1
@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+from ai.llm_backend import CircuitBreaker, FakeBackend
+from ai.prompt_builder import EMOTION_MARKER, PromptBuilder
+from ai.summarizer import ConversationSummarizer
+
+SYSTEM_PROMPT = "You are Aura.\n" + EMOTION_MARKER + " {emotion}\n{conversation_context}\n"
+TURNS = ["User: I can't sleep before exams\nAssistant: That sounds stressful.",
+         "User: My friends help a bit\nAssistant: I'm glad they do."]
+
+
+def make_summarizer(backend, breaker, timeout):
+    return ConversationSummarizer(PromptBuilder(SYSTEM_PROMPT), backend=backend, circuit_breaker=breaker,
+                                  batch_turns=2, timeout=timeout)
+
+
+def test_llm_summary_records_success():
+    breaker = CircuitBreaker(failure_threshold=1)
+    summarizer = make_summarizer(FakeBackend(), breaker, timeout=5)
+    summarizer._pending["u1"] = list(TURNS)
+    asyncio.run(summarizer.compact("u1"))
+    assert summarizer.metrics["llm_summaries"] == 1
+    assert breaker.state == "closed"
+
+
+def test_slow_llm_falls_back_to_extractive_summary():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    summarizer = make_summarizer(FakeBackend(latency=1.0), breaker, timeout=0.05)
+    summarizer._pending["u1"] = list(TURNS)
+
+    started = time.monotonic()
+    asyncio.run(summarizer.compact("u1"))
+    assert time.monotonic() - started < 0.9
+    assert summarizer.metrics["timeouts"] == 1
+    assert summarizer.prompt_builder.get_summary("u1").startswith("Earlier the user said: I can't sleep")
+    assert breaker.state == "open"
+
+    # An open breaker skips the LLM entirely
+    summarizer._pending["u2"] = list(TURNS)
+    asyncio.run(summarizer.compact("u2"))
+    assert summarizer.metrics["extractive_summaries"] == 2
+    assert summarizer.metrics["llm_summaries"] == 0
+
+
+def test_failures_are_recorded():
+    breaker = CircuitBreaker(failure_threshold=5)
+    summarizer = make_summarizer(FakeBackend(failure_rate=1.0), breaker, timeout=5)
+    summarizer._pending["u1"] = list(TURNS)
+    asyncio.run(summarizer.compact("u1"))
+    assert summarizer.metrics["errors"] == 1
+    assert breaker.consecutive_failures == 1
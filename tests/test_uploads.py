@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+from ai.uploads import UploadStore, UploadTooLarge, read_upload, stream_upload
+
+
+class FakeUpload:
+    """Just enough of UploadFile for the streaming helpers."""
+
+    def __init__(self, data: bytes, size=None):
+        self.data = data
+        self.size = size
+        self.offset = 0
+
+    async def read(self, size: int) -> bytes:
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+
+def add(store, data: bytes, owner: str, filename: str = "clip.wav"):
+    return store.add(data, hashlib.sha256(data).hexdigest(), len(data), "audio", filename, owner)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path / "uploads"))
+
+
+def test_identical_content_is_stored_once(store):
+    first = add(store, b"voice" * 100, "alice")
+    second = add(store, b"voice" * 100, "bob", filename="other.wav")
+    assert not first["deduplicated"] and second["deduplicated"]
+    assert first["path"] == second["path"]
+    assert store.stats()["blobs"] == 1 and store.stats()["refs"] == 2
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_blob_ids_only_resolve_for_their_uploaders(store):
+    blob = add(store, b"private", "alice")
+    assert store.resolve(blob["blob_id"], "alice") == blob["path"]
+    assert store.resolve(blob["blob_id"], "mallory") is None
+
+
+def test_temp_file_uploads_are_moved_into_place(store):
+    path = store.temp_path()
+    with open(path, "wb") as f:
+        f.write(b"streamed")
+    blob = store.add(path, hashlib.sha256(b"streamed").hexdigest(), 8, "audio", "a.WAV", "alice")
+    assert blob["path"].endswith(".wav") and not os.path.exists(path)
+    with open(blob["path"], "rb") as f:
+        assert f.read() == b"streamed"
+
+
+def test_content_is_written_outside_the_store_lock(store, monkeypatch):
+    write_temp = store._write_temp
+    held = []
+    monkeypatch.setattr(store, "_write_temp", lambda data: held.append(store._lock.locked()) or write_temp(data))
+
+    add(store, b"a" * 1000, "alice")
+    assert held == [False]
+    # Known content is not written at all
+    add(store, b"a" * 1000, "bob")
+    assert held == [False]
+
+
+def test_concurrent_adds_of_the_same_content(store):
+    threads = [threading.Thread(target=add, args=(store, b"same" * 1000, f"user{i}")) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.stats()["blobs"] == 1 and store.stats()["refs"] == 8
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_user_quota_drops_least_recently_used_uploads(store):
+    old = add(store, b"o" * 600, "alice")
+    shared = add(store, b"s" * 600, "alice")
+    add(store, b"s" * 600, "bob")
+    new = add(store, b"n" * 600, "alice")
+    store.resolve(shared["blob_id"], "alice")
+    store.resolve(new["blob_id"], "alice")
+
+    result = store.collect_garbage(max_user_bytes=1300)
+    assert result["dropped_refs"] == 1 and result["deleted_blobs"] == 1
+    assert store.resolve(old["blob_id"], "alice") is None
+    assert store.user_usage("alice") == {"blobs": 2, "bytes": 1200}
+    assert store.resolve(shared["blob_id"], "bob") is not None
+
+
+def test_shared_blob_stays_for_other_users_under_quota(store):
+    shared = add(store, b"s" * 600, "alice")
+    add(store, b"s" * 600, "bob")
+    add(store, b"n" * 600, "alice")
+
+    store.collect_garbage(max_user_bytes=700)
+    assert store.resolve(shared["blob_id"], "alice") is None
+    assert store.resolve(shared["blob_id"], "bob") is not None
+
+
+def test_retention_and_total_size_limits(store):
+    stale = add(store, b"stale", "alice")
+    later = time.time() + 100
+    fresh = add(store, b"fresh", "alice")
+    with store._lock, store._conn:
+        store._conn.execute("UPDATE blobs SET accessed_at = ? WHERE blob_id = ?", (later, fresh["blob_id"]))
+
+    result = store.collect_garbage(retention=50, now=later + 10)
+    assert result["deleted_blobs"] == 1
+    assert not os.path.exists(stale["path"]) and os.path.exists(fresh["path"])
+
+    for i in range(3):
+        add(store, bytes([i]) * 100, "bob")
+    store.collect_garbage(max_bytes=150)
+    assert store.stats()["bytes"] <= 150
+
+
+def test_stale_temp_files_are_removed(store):
+    path = store.temp_path()
+    with open(path, "wb") as f:
+        f.write(b"abandoned")
+    assert store.collect_garbage(now=time.time() + 2 * 3600)["deleted_files"] == 1
+    assert not os.path.exists(path)
+
+
+def test_stream_upload_hashes_and_enforces_the_limit(tmp_path):
+    data = os.urandom(3000)
+    destination = str(tmp_path / "upload")
+    result = asyncio.run(stream_upload(FakeUpload(data), destination, chunk_size=1024))
+    assert result == {"size": 3000, "sha256": hashlib.sha256(data).hexdigest()}
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(stream_upload(FakeUpload(data), str(tmp_path / "big"), max_bytes=2000, chunk_size=1024))
+    assert os.listdir(tmp_path) == ["upload"]
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(read_upload(FakeUpload(data, size=3000), max_bytes=2000))
+    assert asyncio.run(read_upload(FakeUpload(data)))[1] == hashlib.sha256(data).hexdigest()
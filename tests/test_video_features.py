@@ -0,0 +1,71 @@
+import io
+
+import cv2
+import numpy as np
+import pytest
+
+from ai.emotion_recognition import EmotionRecognition
+from ai.video_features import collect_sampled_frames, iter_sampled_frames, keyframe_indices
+
+FRAME_COUNT = 300
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    """Clip whose content jumps now and then, so keyframes fall at irregular positions."""
+    path = str(tmp_path_factory.mktemp("video") / "clip.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (320, 240))
+    for index in range(FRAME_COUNT):
+        frame = np.full((240, 320, 3), (index // 25) * 20 % 256, dtype=np.uint8)
+        cv2.putText(frame, str(index), (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def sampled(path, interval, max_frames=0, keyframes=None):
+    cap = cv2.VideoCapture(path)
+    try:
+        return list(iter_sampled_frames(cap, interval, max_frames, keyframes=keyframes))
+    finally:
+        cap.release()
+
+
+def test_keyframes_are_listed_without_decoding(clip):
+    keyframes = keyframe_indices(clip)
+    assert keyframes[0] == 0
+    assert 1 < len(keyframes) < FRAME_COUNT
+    assert np.all(np.diff(keyframes) > 0)
+    with open(clip, "rb") as f:
+        assert np.array_equal(keyframe_indices(io.BytesIO(f.read())), keyframes)
+
+
+@pytest.mark.parametrize("interval", [1, 7, 30, 45, 110])
+def test_keyframe_seeks_match_sequential_reading(clip, interval):
+    expected = sampled(clip, interval)
+    actual = sampled(clip, interval, keyframes=keyframe_indices(clip))
+    assert [index for index, _ in actual] == [index for index, _ in expected]
+    assert all(np.array_equal(a, b) for (_, a), (_, b) in zip(actual, expected))
+    assert [index for index, _ in expected] == list(range(0, FRAME_COUNT, interval))
+
+
+def test_max_frames_caps_samples(clip):
+    cap = cv2.VideoCapture(clip)
+    indices, frames = collect_sampled_frames(cap, 20, 4, keyframes=keyframe_indices(clip))
+    cap.release()
+    assert indices.tolist() == [0, 20, 40, 60]
+    assert frames.shape == (4, 120, 160)
+
+
+def test_analysis_is_the_same_from_path_and_bytes(clip, monkeypatch):
+    monkeypatch.setenv("VIDEO_SEEK_GAP", "0.1")
+    analyzer = EmotionRecognition(cache_size=0, media_cache_backend="none")
+    with open(clip, "rb") as f:
+        data = f.read()
+    from_path = analyzer._analyze_video(clip)
+    from_bytes = analyzer._analyze_bytes(data, analyzer._analyze_video)
+    assert "error" not in from_path
+    assert from_bytes == from_path
+
+    monkeypatch.setenv("VIDEO_SEEK_GAP", "0")
+    assert EmotionRecognition(cache_size=0, media_cache_backend="none")._analyze_video(clip) == from_path